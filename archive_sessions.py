@@ -0,0 +1,170 @@
+''' Pack finished sessions into one compressed archive and read them back.
+
+    python archive_sessions.py pack RESULTS_DIR sessions.zip [--remove]
+    python archive_sessions.py list sessions.zip
+    python archive_sessions.py cat sessions.zip PARTICIPANT [SUFFIX]
+
+Each session's files (results, practice log, event log, metadata, journal,
+.npz) are stored LZMA-compressed under "<participant>/", followed by
+"<participant>/index.json" with its date, config hash and members. That
+entry is written last, so it marks the session as archived, and the index
+travels with the zip. "<archive>.index.json" next to the archive caches
+the collected entries while the archive is unchanged, so batches can be
+selected without opening it. Single members are read straight from the zip
+with no extraction.
+'''
+
+import argparse
+import io
+import json
+import os
+import sys
+import zipfile
+from datetime import datetime
+
+from results_schema import is_results_file
+
+SESSION_SUFFIXES = (".csv", "_practice.csv", "_events.bin", "_meta.json", "_journal.json", ".npz")
+ENTRY = "index.json"    # per-session index entry inside the archive
+
+
+def entry_member(participant):
+    return f"{participant}/{ENTRY}"
+
+
+def index_path(archive):
+    return archive + ".index.json"
+
+
+def archive_stamp(archive):
+    st = os.stat(archive)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def load_index(archive):
+    '''participant -> date, config hash and members, from the entries in the archive.
+
+    The sidecar cache is used while the archive's size and mtime match it.
+    '''
+    if not os.path.exists(archive):
+        return {}
+    stamp = archive_stamp(archive)
+    try:
+        with open(index_path(archive)) as f:
+            cached = json.load(f)
+        if cached["archive"] == stamp:
+            return cached["sessions"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass        # missing, stale or foreign sidecar: rebuild it
+    with zipfile.ZipFile(archive) as zf:
+        index = {name.split("/")[0]: json.loads(zf.read(name))
+                 for name in zf.namelist() if name.endswith("/" + ENTRY)}
+    save_index(archive, index, stamp)
+    return index
+
+
+def save_index(archive, index, stamp):
+    tmp = index_path(archive) + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"archive": stamp, "sessions": index}, f, indent=1, sort_keys=True)
+    os.replace(tmp, index_path(archive))
+
+
+def finished_sessions(results_dir):
+    '''Participants whose results file was finalized (no .part left, journal complete).'''
+    found = []
+    for name in sorted(os.listdir(results_dir)):
+        if not name.endswith(".csv") or not is_results_file(os.path.join(results_dir, name)):
+            continue
+        participant = name[:-len(".csv")]
+        journal = os.path.join(results_dir, f"{participant}_journal.json")
+        if os.path.exists(journal):
+            with open(journal) as f:
+                if not json.load(f).get("complete"):
+                    continue
+        found.append(participant)
+    return found
+
+
+def session_entry(results_dir, participant, members):
+    meta_path = os.path.join(results_dir, f"{participant}_meta.json")
+    meta = {}
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+    date = meta.get("started", "")[:10]
+    if not date:
+        results = os.path.join(results_dir, f"{participant}.csv")
+        date = datetime.fromtimestamp(os.path.getmtime(results)).date().isoformat()
+    return {"date": date, "config_hash": meta.get("config_hash"), "members": members}
+
+
+def pack(results_dir, archive, remove=False):
+    added = {}
+    with zipfile.ZipFile(archive, "a", compression=zipfile.ZIP_LZMA) as zf:
+        stored = set(zf.namelist())
+        for participant in finished_sessions(results_dir):
+            if entry_member(participant) in stored:
+                continue
+            members = []
+            for suffix in SESSION_SUFFIXES:
+                path = os.path.join(results_dir, participant + suffix)
+                if os.path.exists(path):
+                    member = f"{participant}/{participant}{suffix}"
+                    zf.write(path, member)
+                    members.append(member)
+            entry = session_entry(results_dir, participant, members)
+            zf.writestr(entry_member(participant), json.dumps(entry, indent=1, sort_keys=True))
+            added[participant] = entry
+
+    if added:
+        load_index(archive)     # refresh the sidecar cache
+        if remove:
+            with zipfile.ZipFile(archive) as zf:
+                bad = zf.testzip()
+            if bad is not None:
+                sys.exit(f"Archive check failed at {bad}, loose files kept")
+            for entry in added.values():
+                for member in entry["members"]:
+                    os.remove(os.path.join(results_dir, os.path.basename(member)))
+    return list(added)
+
+
+def read_member(archive, participant, suffix=".csv"):
+    '''Bytes of one session file, read directly from the archive.'''
+    with zipfile.ZipFile(archive) as zf:
+        return zf.read(f"{participant}/{participant}{suffix}")
+
+
+def open_results(archive, participant):
+    '''Text stream of a participant's results CSV, e.g. for pandas.read_csv.'''
+    return io.StringIO(read_member(archive, participant).decode())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("pack", help="add finished sessions to the archive")
+    p.add_argument("results_dir")
+    p.add_argument("archive")
+    p.add_argument("--remove", action="store_true", help="delete loose files once archived")
+    p = sub.add_parser("list", help="show the archive index")
+    p.add_argument("archive")
+    p = sub.add_parser("cat", help="print one session file")
+    p.add_argument("archive")
+    p.add_argument("participant")
+    p.add_argument("suffix", nargs="?", default=".csv")
+    args = parser.parse_args()
+
+    if args.command == "pack":
+        added = pack(args.results_dir, args.archive, args.remove)
+        print(f"Archived {len(added)} session(s) into {args.archive}")
+    elif args.command == "list":
+        for participant, entry in sorted(load_index(args.archive).items()):
+            print(f"{participant}\t{entry['date']}\t{entry['config_hash']}\t{len(entry['members'])} files")
+    else:
+        sys.stdout.buffer.write(read_member(args.archive, args.participant, args.suffix))
+
+
+if __name__ == "__main__":
+    main()
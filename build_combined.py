@@ -0,0 +1,109 @@
+''' Build combined_output.csv, the trial table analysis.ipynb starts from.
+
+    python build_combined.py RESULTS_DIR [-o combined_output.csv]
+
+Every participant results file in RESULTS_DIR is added with a
+Participant_ID column taken from its file name, upgraded to the current
+results schema on the way. combined_output.csv.manifest.json
+maps each source file to its SHA-256. On later runs only new files are
+appended. If a file changed, its participant's rows are dropped in one
+streaming pass and the file is re-added. Rebuilding from scratch is never
+needed.
+'''
+
+import argparse
+import csv
+import json
+import os
+
+from results_schema import HEADER, is_results_file, read_results, upgrade
+from session_meta import file_hash
+
+ID_COLUMN = "Participant_ID"
+COLUMNS = HEADER + [ID_COLUMN]
+
+
+def manifest_path(output):
+    return output + ".manifest.json"
+
+
+def load_manifest(output):
+    if not os.path.exists(manifest_path(output)) or not os.path.exists(output):
+        return {}
+    with open(manifest_path(output)) as f:
+        return json.load(f)
+
+
+def save_manifest(output, manifest):
+    tmp = manifest_path(output) + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, manifest_path(output))
+
+
+def scan(results_dir, output):
+    '''Results files in results_dir as {file name: sha256}.'''
+    found = {}
+    for name in sorted(os.listdir(results_dir)):
+        path = os.path.join(results_dir, name)
+        if (name.endswith(".csv") and os.path.abspath(path) != os.path.abspath(output)
+                and is_results_file(path)):
+            found[name] = file_hash(path)
+    return found
+
+
+def rewrite(output, drop):
+    # one streaming pass over the dataset: leave out the rows of changed
+    # participants and bring older columns up to the current schema
+    tmp = output + ".tmp"
+    with open(output, newline="") as src, open(tmp, "w", newline="") as dst:
+        reader, writer = csv.reader(src), csv.writer(dst)
+        header = next(reader)
+        writer.writerow(COLUMNS)
+        id_index = header.index(ID_COLUMN)
+        for chunk in iter(lambda: [row for _, row in zip(range(10000), reader)], []):
+            kept = [row for row in chunk if row[id_index] not in drop]
+            writer.writerows(upgrade(header, kept, COLUMNS))
+    os.replace(tmp, output)
+
+
+def build(results_dir, output):
+    manifest = load_manifest(output)
+    current = scan(results_dir, output)
+    new = [name for name in current if name not in manifest]
+    changed = [name for name in current if name in manifest and manifest[name] != current[name]]
+
+    header = None
+    if manifest:
+        with open(output, newline="") as f:
+            header = next(csv.reader(f))
+    if changed or (header is not None and header != COLUMNS):
+        rewrite(output, {name[:-len(".csv")] for name in changed})
+    if not new and not changed:
+        return 0
+
+    with open(output, "a" if manifest else "w", newline="") as f:
+        writer = csv.writer(f)
+        if not manifest:
+            writer.writerow(COLUMNS)
+        for name in changed + new:
+            _, rows = read_results(os.path.join(results_dir, name))
+            participant = name[:-len(".csv")]
+            writer.writerows(row + [participant] for row in rows)
+            manifest[name] = current[name]
+
+    save_manifest(output, manifest)
+    return len(new) + len(changed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("results_dir")
+    parser.add_argument("-o", "--output", default="combined_output.csv")
+    args = parser.parse_args()
+    count = build(args.results_dir, args.output)
+    print(f"Added or updated {count} participant file(s) in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
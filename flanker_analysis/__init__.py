@@ -0,0 +1,20 @@
+''' Analysis pipeline for the flanker experiment (formerly analysis.ipynb).
+
+Stages: ingest -> clean -> trim -> aggregate -> inference -> report. Run the whole
+pipeline with `python -m flanker_analysis`, or import the stages.
+'''
+
+from .ingest import load_trials, load_forms
+from .clean import clean_trials, clean_forms
+from .trim import trim_trials
+from .aggregate import (summarise, cached_entries, participant_summaries, participant_means,
+                        condition_accuracy, median_rt_table, participant_table)
+from .effects import congruency_effects, paired_tests
+from .inference import module_anovas, rt_summary, rt_correlations, median_split_tests
+from .resample import resample_effects
+from .reliability import split_half_reliability
+from .mixed import mixed_models
+from .exgauss import exgauss_fits, exgauss_summary
+from .diffusion import ez_diffusion, wiener_fits, diffusion_summary
+from .stream import accumulate, stream_summaries, stream_ez
+from .report import write_report
@@ -0,0 +1,122 @@
+''' Participant-level summaries of the trial table.
+
+summarise() reduces trials to one row per participant, module and
+condition. The group-level tables are built from those rows, which
+participant_summaries() caches per results file together with the EZ
+cell statistics and the trimming report. Files are hashed before
+anything is read (cached_entries()), so only new or changed files need
+to be ingested.
+'''
+
+import hashlib
+
+import pandas as pd
+
+from results_schema import results_files
+from session_meta import file_hash
+
+from . import cache
+from .diffusion import cell_stats
+from .ingest import ID_COLUMN, concat_frames, participant_id
+
+EMOJI_MODULES = ["Emoji Module", "Letter+Emoji Module"]
+CELL = ['Participant_ID', 'Module', 'Condition']
+
+
+def summarise(df):
+    '''Trial counts, accuracy and mean / median RT per participant, module and condition.'''
+    summary = df.groupby(CELL, observed=True).agg(
+        trials=('Correct', 'size'),
+        scored=('Correct', 'count'),     # trials with a Correct value
+        correct=('Correct', 'sum'),
+        accuracy=('Correct', 'mean'),
+        mean_rt=('RT', 'mean'),
+        median_rt=('RT', 'median'),
+    )
+    summary['correct_median_rt'] = (
+        df[df['Correct'] == 1].groupby(CELL, observed=True)['RT'].median()
+    )
+    return summary.reset_index()
+
+
+def cached_entries(results_dir, cache_dir, settings=()):
+    '''Cache key and cached entry (None if missing) of every results file, by path.
+
+    settings describes how trials are prepared (e.g. trimming) and is part
+    of the key. Only the files are hashed; none is parsed.
+    '''
+    keys = {path: hashlib.sha256(f"{file_hash(path)}{settings!r}".encode()).hexdigest()
+            for path in results_files(results_dir)}
+    return keys, {path: cache.load(cache_dir, "participants", key) for path, key in keys.items()}
+
+
+def participant_summaries(trials, removed, keys, entries, cache_dir):
+    '''Summary rows, EZ cell statistics and trimming report of every participant.
+
+    Cached entries are reused as they are; participants without one are
+    summarised from trials and removed (which must hold at least their
+    rows) and stored. Returns (summaries, cells, removed, number of
+    participants recomputed).
+    '''
+    stale = [path for path, entry in entries.items() if entry is None]
+    if stale:
+        ids = [participant_id(path) for path in stale]
+        fresh = trials[trials[ID_COLUMN].isin(ids)]
+        tables = {
+            "summaries": summarise(fresh),
+            "cells": cell_stats(fresh),
+            "removed": removed[removed[ID_COLUMN].isin(ids)],
+        }
+        parts = {name: dict(list(table.groupby(ID_COLUMN, observed=True)))
+                 for name, table in tables.items()}
+        for path, participant in zip(stale, ids):
+            # a participant without analysable trials gets empty tables
+            entries[path] = {name: parts[name].get(participant, table.iloc[:0])
+                             for name, table in tables.items()}
+            cache.store(cache_dir, "participants", keys[path], entries[path])
+
+    ordered = [entries[path] for path in sorted(entries, key=participant_id)]
+    summaries, cells = (concat_frames([e[name] for e in ordered]).sort_values(CELL, ignore_index=True)
+                        for name in ("summaries", "cells"))
+    removed = concat_frames([e["removed"] for e in ordered]).reset_index(drop=True)
+    return summaries, cells, removed, len(stale)
+
+
+def participant_means(summaries):
+    '''Accuracy and mean RT per participant, module and condition (agg_df).'''
+    return summaries[CELL + ['accuracy', 'mean_rt']].reset_index(drop=True)
+
+
+def condition_accuracy(summaries):
+    '''Accuracy and inaccuracy per condition, most inaccurate first.'''
+    totals = summaries.groupby('Condition', observed=True)[['correct', 'scored']].sum()
+    summary = (totals['correct'] / totals['scored']).rename('accuracy').reset_index()
+    summary['inaccuracy'] = 1 - summary['accuracy']
+    return summary.sort_values('inaccuracy', ascending=False).reset_index(drop=True)
+
+
+def median_rt_table(summaries):
+    '''Median correct-trial RT per participant, one "<Module>_<condition>" column per cell.'''
+    agg = summaries.dropna(subset=['correct_median_rt']).rename(columns={'correct_median_rt': 'RT'})
+    pivot = agg.pivot_table(index='Participant_ID', columns=['Module', 'Condition'], values='RT',
+                           observed=True)
+    pivot.columns = [f"{mod}_{cond}" for mod, cond in pivot.columns]
+    pivot = pivot.reset_index()
+    return pivot[['Participant_ID'] + sorted(c for c in pivot.columns if c != 'Participant_ID')]
+
+
+def participant_table(pivot, forms):
+    '''Median RTs of the emoji modules joined with the survey scores.'''
+    merged = pd.merge(pivot.rename(columns={'Participant_ID': 'Participant ID'}), forms,
+                      on="Participant ID", how="left")
+    keep = ["Participant ID", "Empathy_Score", "Familiarity", "Usage"] + \
+           [c for c in merged.columns if c.startswith("Emoji Module")] + \
+           [c for c in merged.columns if c.startswith("Letter+Emoji Module")]
+    table = merged[keep].copy()
+
+    conditions = ["congruent", "incongruent", "neutral"]
+    table["EmojiModule_AvgRT"] = table.reindex(
+        columns=[f"Emoji Module_{c}" for c in conditions]).mean(axis=1)
+    table["LetterEmojiModule_AvgRT"] = table.reindex(
+        columns=[f"Letter+Emoji Module_{c}" for c in conditions]).mean(axis=1)
+    return table
@@ -0,0 +1,71 @@
+''' On-disk cache of analysis results, keyed by a content hash.
+
+Entries live in <cache_dir>/<kind>/<key>.pkl. A key is a hash of whatever
+the result was computed from (a source file or a data frame), so a stale
+entry is never read back, just left unused.
+'''
+
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+CACHE_VERSION = 2    # bump when a cached result's layout changes
+
+
+def frame_hash(df, *extra):
+    '''SHA-256 of a frame's columns and values, plus any extra parameters.'''
+    h = hashlib.sha256(repr((CACHE_VERSION, list(df.columns), extra)).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def entry_path(cache_dir, kind, key):
+    return os.path.join(cache_dir, f"{kind}-v{CACHE_VERSION}", f"{key}.pkl")
+
+
+def load(cache_dir, kind, key):
+    '''The cached object, or None if it is missing or unreadable.'''
+    path = entry_path(cache_dir, kind, key)
+    if not os.path.exists(path):
+        return None
+    try:
+        return pd.read_pickle(path)
+    except Exception:     # partial or foreign file: recompute it
+        return None
+
+
+def store(cache_dir, kind, key, obj):
+    path = entry_path(cache_dir, kind, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    pd.to_pickle(obj, tmp)
+    os.replace(tmp, path)
+
+
+def per_participant(df, kind, fit, cache_dir=None, workers=None, *args):
+    '''fit(participant_df, *args) for every participant, concatenated.
+
+    Results are cached under a hash of each participant's rows and args, so
+    only new or changed participants are fitted, in a process pool unless
+    workers is 1.
+    '''
+    groups = {p: pdf.reset_index(drop=True) for p, pdf in df.groupby('Participant_ID')}
+    keys = {p: frame_hash(pdf, kind, *args) for p, pdf in groups.items()}
+    results = {p: load(cache_dir, kind, keys[p]) if cache_dir else None for p in groups}
+
+    stale = [p for p, result in results.items() if result is None]
+    if stale:
+        data = [groups[p] for p in stale]
+        extra = [[a] * len(data) for a in args]
+        if workers == 1:
+            fresh = list(map(fit, data, *extra))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                fresh = list(pool.map(fit, data, *extra, chunksize=max(len(data) // 64, 1)))
+        for p, result in zip(stale, fresh):
+            results[p] = result
+            if cache_dir:
+                store(cache_dir, kind, keys[p], result)
+    return pd.concat([results[p] for p in sorted(results)], ignore_index=True) if results else None
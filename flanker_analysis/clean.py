@@ -0,0 +1,59 @@
+''' Tidy the trial table and score the survey. '''
+
+TRIAL_COLUMNS = ['Module', 'Target/Check', 'Condition', 'Flanker', 'Response', 'Correct', 'RT',
+                 'Participant_ID', 'is_attention']
+
+POS_NEG = "How positive or negative does this emoji feel to you?"
+STRONG_CALM = "How strong or calm does this emoji feel?"
+FAMILIARITY = "How familiar are you with this emoji?"
+USAGE = "How often do you use this emoji in daily conversations?"
+TASK_RATING = "How did you find the task overall?"
+
+EMPATHY_ITEMS = [
+    "When someone else is feeling excited, I tend to get excited too.",
+    "It upsets me to see someone being treated disrespectfully.",
+    "I enjoy making other people feel better.",
+    "I have tender, concerned feelings for people less fortunate than me.",
+    "I can tell when others are sad even when they do not say anything.",
+    "I become irritated when someone cries.",
+    "I get a strong urge to help when I see someone who is upset.",
+    "I am not really interested in how other people feel.",
+]
+REVERSED_ITEMS = [
+    "I become irritated when someone cries.",
+    "I am not really interested in how other people feel.",
+]
+EMPATHY_SCALE_MAX = 10    # reverse-scored items become 10 - x
+
+
+def clean_trials(df):
+    '''Keep the analysed columns and normalise module / condition labels.'''
+    df = df[TRIAL_COLUMNS].copy()
+    df['Module'] = _relabel(df['Module'], str.strip)
+    df['Condition'] = _relabel(df['Condition'], str.lower)
+    return df
+
+
+def _relabel(column, fn):
+    '''Apply fn once per category rather than once per row.'''
+    return column.astype("category").map(fn, na_action="ignore").astype("category")
+
+
+def clean_forms(forms):
+    '''Participant ID, Empathy_Score, Familiarity and Usage per survey response.'''
+    forms = forms.copy()
+    forms.columns = forms.columns.str.strip()
+    forms = forms.drop(columns=[c for c in forms.columns if POS_NEG in c or STRONG_CALM in c])
+
+    familiarity_cols = [c for c in forms.columns if FAMILIARITY in c]
+    usage_cols = [c for c in forms.columns if USAGE in c]
+    forms["Familiarity"] = forms[familiarity_cols].mean(axis=1, skipna=True)
+    forms["Usage"] = forms[usage_cols].mean(axis=1, skipna=True)
+
+    empathy_cols = [c for c in EMPATHY_ITEMS if c in forms.columns]
+    for col in REVERSED_ITEMS:
+        if col in forms.columns:
+            forms[col] = EMPATHY_SCALE_MAX - forms[col]
+    forms["Empathy_Score"] = forms[empathy_cols].mean(axis=1, skipna=True)
+
+    return forms[["Participant ID", "Empathy_Score", "Familiarity", "Usage"]]
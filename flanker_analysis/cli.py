@@ -0,0 +1,178 @@
+''' Command line entry point: run the whole pipeline over a batch.
+
+    python -m flanker_analysis RESULTS [--forms FORMS.csv] [--out report] [--profile]
+                               [--workers N] [--cache DIR | --no-cache]
+                               [--resamples N] [--splits N] [--seed S] [--no-mixed]
+                               [--no-exgauss] [--wiener] [--min-rt S] [--max-rt S]
+                               [--trim none|sd|mad|recursive] [--criterion C]
+                               [--chunksize N]
+
+RESULTS is a directory of participant results files or a combined CSV.
+For a directory the per-participant summaries are cached by file hash,
+and unless a trial-level model needs every trial only new or changed
+files are read.
+Each stage is timed; with --profile a cProfile dump per stage is written
+to the output directory as well.
+'''
+
+import argparse
+import cProfile
+import os
+import time
+from contextlib import contextmanager
+
+from . import (aggregate, clean, diffusion, effects, exgauss, inference, ingest, mixed,
+               reliability, resample, stream, trim)
+from .report import write_report
+
+
+@contextmanager
+def stage(name, timings, profile_dir=None):
+    profiler = cProfile.Profile() if profile_dir else None
+    start = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(os.path.join(profile_dir, f"{name}.prof"))
+        timings[name] = time.perf_counter() - start
+        print(f"[{name}] {timings[name]:.3f}s")
+
+
+def run(results, forms_path=None, out_dir="report", profile=False, workers=None,
+        cache_dir=None, resamples=5000, splits=5000, seed=0,
+        mixed_models=True, exgauss_models=True, wiener=False,
+        min_rt=None, max_rt=None, trim_method="none", criterion=2.5, chunksize=None):
+    os.makedirs(out_dir, exist_ok=True)
+    profile_dir = out_dir if profile else None
+    timings = {}
+    tables = {}
+    trials = forms = cells = entries = removed = None
+    streamed = bool(chunksize)
+
+    if chunksize:
+        # out-of-core: summaries from a stream of chunks, no trial table
+        with stage("stream", timings, profile_dir):
+            acc = stream.accumulate(results, chunksize, min_rt, max_rt)
+            summaries = stream.stream_summaries(acc)
+        if forms_path or trim_method != "none":
+            print("[stream] survey tables, cell trimming and trial-level models need the "
+                  "trial table; skipped")
+    else:
+        trimming = (min_rt, max_rt, trim_method, criterion)
+        if cache_dir and os.path.isdir(results):
+            keys, entries = aggregate.cached_entries(results, cache_dir, trimming)
+        # without trial-level models only the files missing from the cache are read
+        need_trials = entries is None or mixed_models or exgauss_models or wiener or splits
+        with stage("ingest", timings, profile_dir):
+            if need_trials:
+                trials, file_timings = ingest.load_trials(results, workers)
+            else:
+                stale = [path for path, entry in entries.items() if entry is None]
+                trials, file_timings = ingest.read_results_files(stale, workers) if stale \
+                    else (None, None)
+            if file_timings is not None:
+                tables["ingest_timings"] = file_timings
+            forms = ingest.load_forms(forms_path) if forms_path else None
+
+        with stage("clean", timings, profile_dir):
+            trials = clean.clean_trials(trials) if trials is not None else None
+            forms = clean.clean_forms(forms) if forms is not None else None
+
+        with stage("trim", timings, profile_dir):
+            if trials is not None:
+                trials, removed = trim.trim_trials(trials, *trimming)
+                tables["trimmed_trials"] = removed
+                print(f"[trim] {int(removed['removed_total'].sum())} of "
+                      f"{int(removed['trials'].sum())} trials removed")
+
+    with stage("aggregate", timings, profile_dir):
+        if entries is not None:
+            summaries, cells, tables["trimmed_trials"], recomputed = \
+                aggregate.participant_summaries(trials, removed, keys, entries, cache_dir)
+            print(f"[aggregate] {recomputed} participant(s) recomputed")
+        elif not streamed:
+            summaries = aggregate.summarise(trials)
+        agg_df = aggregate.participant_means(summaries)
+        tables["accuracy_by_module"] = agg_df.groupby('Module', observed=True)['accuracy'].describe()
+        tables["rt_by_module"] = agg_df.groupby('Module', observed=True)['mean_rt'].describe()
+        tables["accuracy_by_condition"] = aggregate.condition_accuracy(summaries)
+        if not streamed:
+            tables["participant_median_rt_by_module"] = aggregate.median_rt_table(summaries)
+        if forms is not None:
+            table = aggregate.participant_table(tables["participant_median_rt_by_module"], forms)
+
+    with stage("inference", timings, profile_dir):
+        tables.update(inference.module_anovas(agg_df))
+        tables["rt_summary"] = inference.rt_summary(summaries)
+        effect_table = effects.congruency_effects(summaries)
+        tables["congruency_effects"] = effects.paired_tests(effect_table)
+        if resamples:
+            tables["congruency_resampling"] = resample.resample_effects(
+                effect_table, resamples, resamples, seed, workers)
+        if streamed:
+            tables["ez_diffusion_by_condition"] = diffusion.diffusion_summary(stream.stream_ez(acc))
+        else:
+            if mixed_models:
+                tables["mixed_models"] = mixed.mixed_models(trials, cache_dir, workers)
+            if exgauss_models:
+                fits = exgauss.exgauss_fits(trials, cache_dir, workers)
+                tables["exgauss_by_condition"] = exgauss.exgauss_summary(fits)
+            if cells is None:
+                cells = diffusion.cell_stats(trials)
+            tables["ez_diffusion_by_condition"] = diffusion.diffusion_summary(
+                diffusion.ez_from_stats(cells))
+            if wiener:
+                fits = diffusion.wiener_fits(trials, cache_dir, workers)
+                tables["wiener_by_condition"] = diffusion.diffusion_summary(fits)
+            if splits:
+                tables["split_half_reliability"] = reliability.split_half_reliability(
+                    trials, splits, seed, workers)
+        if forms is not None:
+            tables["survey_correlations"] = inference.rt_correlations(table)
+            tables["survey_median_splits"] = inference.median_split_tests(table)
+
+    with stage("report", timings, profile_dir):
+        path = write_report(tables, out_dir)
+
+    print(f"Report written to {path}")
+    return tables, timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="flanker_analysis", description=__doc__.split("\n\n")[0])
+    parser.add_argument("results", help="results directory or combined CSV")
+    parser.add_argument("--forms", help="survey export (Google Forms CSV)")
+    parser.add_argument("--out", default="report", help="output directory")
+    parser.add_argument("--profile", action="store_true", help="write a cProfile dump per stage")
+    parser.add_argument("--workers", type=int, help="processes for reading results files "
+                        "(default: one per CPU, 1 reads serially)")
+    parser.add_argument("--cache", help="per-participant summary cache (default: OUT/cache)")
+    parser.add_argument("--no-cache", action="store_true", help="summarise every participant again")
+    parser.add_argument("--resamples", type=int, default=5000,
+                        help="bootstrap and permutation replicates per effect (0 to skip)")
+    parser.add_argument("--splits", type=int, default=5000,
+                        help="random splits for split-half reliability (0 to skip)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the resampling and splits")
+    parser.add_argument("--no-mixed", action="store_true", help="skip the trial-level mixed models")
+    parser.add_argument("--no-exgauss", action="store_true", help="skip the ex-Gaussian fits")
+    parser.add_argument("--wiener", action="store_true",
+                        help="also fit the diffusion model by full likelihood")
+    parser.add_argument("--min-rt", type=float, help="drop trials faster than this (seconds)")
+    parser.add_argument("--max-rt", type=float, help="drop trials slower than this (seconds)")
+    parser.add_argument("--trim", choices=trim.METHODS, default="none",
+                        help="per-cell outlier rule applied after the absolute cutoffs")
+    parser.add_argument("--criterion", type=float, default=2.5,
+                        help="SDs / MADs from the cell centre for --trim sd and mad")
+    parser.add_argument("--chunksize", type=int,
+                        help="stream RESULTS in chunks of this many trials instead of loading "
+                        "it whole (summary tables only)")
+    args = parser.parse_args(argv)
+    cache_dir = None if args.no_cache else (args.cache or os.path.join(args.out, "cache"))
+    run(args.results, args.forms, args.out, args.profile, args.workers, cache_dir,
+        args.resamples, args.splits, args.seed, not args.no_mixed,
+        not args.no_exgauss, args.wiener,
+        args.min_rt, args.max_rt, args.trim, args.criterion, args.chunksize)
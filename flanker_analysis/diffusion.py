@@ -0,0 +1,145 @@
+''' Diffusion-model parameters per participant, module and condition.
+
+ez_diffusion() applies the closed-form EZ method (Wagenmakers et al.,
+2007) to every cell at once: drift rate v, boundary separation a and
+non-decision time Ter from accuracy and the mean and variance of
+correct RTs. wiener_fits() optionally fits the same three parameters by
+full likelihood (unbiased start, Navarro & Fuss series for the
+first-passage density). It starts from the EZ values, runs per
+participant in a process pool and is cached like the ex-Gaussian fits.
+Both use the conventional scaling s = 0.1.
+'''
+
+import warnings
+
+import numpy as np
+import pandas as pd
+from scipy import optimize
+
+from . import cache
+
+CELL = ['Participant_ID', 'Module', 'Condition']
+S = 0.1
+MIN_TRIALS = 10
+SERIES_TERMS = 7      # terms per side of each first-passage series
+V_BOUNDS = (-1.0, 1.0)
+A_BOUNDS = (0.02, 0.4)
+
+
+def scored_trials(trials):
+    '''Trials with an RT, a condition and a Correct value.'''
+    keep = trials['RT'].notna() & trials['Condition'].notna() & trials['Correct'].notna()
+    return trials.loc[keep, CELL + ['Correct', 'RT']]
+
+
+def cell_stats(trials):
+    '''Trials, accuracy and mean / variance of correct RT per cell.'''
+    df = scored_trials(trials)
+    correct_rt = df['RT'].where(df['Correct'].astype(bool))
+    groups = df.assign(correct_rt=correct_rt).groupby(CELL, observed=True)
+    return groups.agg(
+        n=('Correct', 'size'),
+        accuracy=('Correct', 'mean'),
+        mrt=('correct_rt', 'mean'),
+        vrt=('correct_rt', 'var'),
+    ).reset_index()
+
+
+def ez_diffusion(trials, min_trials=MIN_TRIALS):
+    '''EZ v, a and Ter of every cell; NaN at or below chance accuracy or with too few trials.'''
+    return ez_from_stats(cell_stats(trials), min_trials)
+
+
+def ez_from_stats(cells, min_trials=MIN_TRIALS):
+    '''EZ v, a and Ter from cell statistics shaped like cell_stats().
+
+    Perfect accuracy is edge-corrected to 1 - 1/(2n).
+    '''
+    cells = cells.copy()
+    n = cells['n'].to_numpy(float)
+    pc = cells['accuracy'].to_numpy(float)
+    pc = np.where(pc == 1, 1 - 1 / (2 * n), pc)
+    vrt, mrt = cells['vrt'].to_numpy(float), cells['mrt'].to_numpy(float)
+    valid = (pc > 0.5) & (n >= min_trials) & (vrt > 0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        logit = np.log(pc / (1 - pc))
+        x = logit * (logit * pc ** 2 - logit * pc + pc - 0.5) / vrt
+        v = S * x ** 0.25
+        a = S ** 2 * logit / v
+        y = -v * a / S ** 2
+        mdt = (a / (2 * v)) * (1 - np.exp(y)) / (1 + np.exp(y))
+        ter = mrt - mdt
+
+    cells['v'] = np.where(valid, v, np.nan)
+    cells['a'] = np.where(valid, a, np.nan)
+    cells['ter'] = np.where(valid, ter, np.nan)
+    return cells
+
+
+def first_passage_lower(t, v, a, w=0.5):
+    '''Wiener density at the lower boundary, unit diffusion coefficient, vectorized over t.'''
+    tt = t / a ** 2
+    k = np.arange(-SERIES_TERMS, SERIES_TERMS + 1)[:, None]
+    small = ((w + 2 * k) * np.exp(-(w + 2 * k) ** 2 / (2 * tt))).sum(axis=0) \
+        / np.sqrt(2 * np.pi * tt ** 3)
+    k = np.arange(1, 2 * SERIES_TERMS + 1)[:, None]
+    large = np.pi * (k * np.exp(-k ** 2 * np.pi ** 2 * tt / 2) * np.sin(k * np.pi * w)).sum(axis=0)
+    density = np.where(tt < 1, small, large)
+    return density * np.exp(-v * a * w - v ** 2 * t / 2) / a ** 2
+
+
+def neg_loglik(params, rt, correct):
+    v, a, ter = params
+    t = rt - ter
+    if t.min() <= 0:
+        return np.inf
+    # correct responses end at the upper boundary: mirror the drift
+    density = first_passage_lower(t, np.where(correct, -v, v) / S, a / S)
+    return -np.log(np.maximum(density, 1e-300)).sum()
+
+
+def fit_cell(rt, correct, start):
+    '''(v, a, ter, converged) maximising the likelihood from start = (v, a, ter).'''
+    bounds = [V_BOUNDS, A_BOUNDS, (0.0, 0.95 * rt.min())]
+    if not np.all(np.isfinite(start)):
+        start = (0.1, 0.1, 0.5 * rt.min())
+    start = [np.clip(x, lo, hi) for x, (lo, hi) in zip(start, bounds)]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        result = optimize.minimize(neg_loglik, start, args=(rt, correct), method="Nelder-Mead",
+                                   bounds=bounds, options={"xatol": 1e-5, "fatol": 1e-6})
+    v, a, ter = result.x
+    return v, a, ter, bool(result.success)
+
+
+def fit_participant(df, min_trials=MIN_TRIALS):
+    '''Full-likelihood v, a and Ter of every cell of one participant.'''
+    ez = ez_diffusion(df, min_trials).set_index(CELL)
+    rows = []
+    for cell, cdf in df.groupby(CELL, observed=True):
+        rt, correct = cdf['RT'].to_numpy(float), cdf['Correct'].to_numpy(bool)
+        if len(rt) >= min_trials:
+            fit = fit_cell(rt, correct, ez.loc[cell, ['v', 'a', 'ter']].to_numpy(float))
+        else:
+            fit = (np.nan, np.nan, np.nan, False)
+        rows.append(cell + (len(rt),) + fit)
+    return pd.DataFrame(rows, columns=CELL + ['n', 'v', 'a', 'ter', 'converged'])
+
+
+def wiener_fits(trials, cache_dir=None, workers=None, min_trials=MIN_TRIALS):
+    '''Full-likelihood diffusion parameters per participant, module and condition.'''
+    df = scored_trials(trials).astype({c: str for c in CELL})
+    fits = cache.per_participant(df, "wiener", fit_participant, cache_dir, workers, min_trials)
+    if fits is None:
+        return pd.DataFrame(columns=CELL + ['n', 'v', 'a', 'ter', 'converged'])
+    return fits
+
+
+def diffusion_summary(cells):
+    '''Mean v, a and Ter per module and condition over the cells with estimates.'''
+    fitted = cells.dropna(subset=['v'])
+    groups = fitted.groupby(['Module', 'Condition'], observed=True)
+    summary = groups[['v', 'a', 'ter']].mean()
+    summary.insert(0, 'cells', groups.size())
+    return summary.reset_index()
@@ -0,0 +1,63 @@
+''' Congruency effects per participant and module, with paired tests.
+
+congruency_effects() pivots the participant summaries once, giving every
+participant x module its incongruent - congruent and incongruent - neutral
+difference. paired_tests() then runs one-sample t-tests on those
+differences for all modules at once. The unit of analysis is the
+participant, not the pooled trial.
+'''
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+CONDITIONS = ["congruent", "incongruent", "neutral"]
+EFFECTS = {
+    # effect: (minuend, subtrahend)
+    "incongruent-congruent": ("incongruent", "congruent"),
+    "incongruent-neutral": ("incongruent", "neutral"),
+}
+
+
+def condition_means(summaries, value="mean_rt"):
+    '''One row per participant x module, one column per condition.'''
+    cells = summaries.pivot_table(index=['Participant_ID', 'Module'], columns='Condition',
+                                  values=value, observed=True)
+    return cells.reindex(columns=CONDITIONS)
+
+
+def congruency_effects(summaries, value="mean_rt"):
+    '''Condition means and effects for every participant x module (NaN when a cell is missing).'''
+    cells = condition_means(summaries, value)
+    for effect, (a, b) in EFFECTS.items():
+        cells[effect] = cells[a] - cells[b]
+    cells.columns.name = None
+    return cells.reset_index()
+
+
+def paired_tests(effects, confidence=0.95):
+    '''Paired t-test, Cohen's dz and confidence interval of each effect in each module.'''
+    long = effects.melt(id_vars=['Participant_ID', 'Module'], value_vars=list(EFFECTS),
+                        var_name='Effect', value_name='diff').dropna(subset=['diff'])
+    g = long.groupby(['Module', 'Effect'], observed=True)['diff'].agg(['count', 'mean', 'std'])
+    n, mean, sd = g['count'].to_numpy(float), g['mean'].to_numpy(), g['std'].to_numpy()
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        se = sd / np.sqrt(n)
+        t = mean / se
+        dz = mean / sd
+    df = n - 1
+    p = 2 * stats.t.sf(np.abs(t), df)
+    half = stats.t.ppf(0.5 + confidence / 2, df) * se
+
+    return pd.DataFrame({
+        'n': g['count'].to_numpy(),
+        'mean_effect': mean,
+        'sd': sd,
+        't': t,
+        'df': df,
+        'p': p,
+        'dz': dz,
+        'ci_low': mean - half,
+        'ci_high': mean + half,
+    }, index=g.index).reset_index()
@@ -0,0 +1,85 @@
+''' Ex-Gaussian decomposition of RT per participant, module and condition.
+
+mu and sigma describe the Gaussian leading edge, tau the exponential tail.
+Each cell is fitted by maximum likelihood, starting from the method-of-
+moments estimate. Cells are spread over a process pool, and results are
+cached per participant under a hash of that participant's trials.
+'''
+
+import numpy as np
+import pandas as pd
+from scipy import optimize
+from scipy.special import log_ndtr
+
+from . import cache
+
+CELL = ['Participant_ID', 'Module', 'Condition']
+MIN_TRIALS = 10
+MIN_SCALE = 1e-4    # seconds; floor for sigma and tau
+LOG_SQRT_2PI = 0.5 * np.log(2 * np.pi)
+
+
+def moments_start(x):
+    '''Method-of-moments (mu, sigma, tau), with the skew clipped to a valid range.'''
+    n, m, s = len(x), x.mean(), x.std(ddof=1)
+    g = ((x - m) ** 3).mean() / x.std() ** 3
+    skew = np.clip(g * np.sqrt(n * (n - 1)) / (n - 2), 0.05, 1.9)    # adjusted sample skewness
+    tau = s * (skew / 2) ** (1 / 3)
+    sigma = np.sqrt(max(s * s - tau * tau, MIN_SCALE ** 2))
+    return m - tau, sigma, tau
+
+
+def neg_loglik(params, x):
+    '''Negative ex-Gaussian log-likelihood and its gradient in (mu, log sigma, log tau).'''
+    mu, log_sigma, log_tau = params
+    sigma, tau = np.exp(log_sigma), np.exp(log_tau)
+    z = (x - mu) / sigma - sigma / tau
+    log_phi = log_ndtr(z)
+    ll = -log_tau + (mu - x) / tau + sigma ** 2 / (2 * tau ** 2) + log_phi
+
+    mills = np.exp(-0.5 * z * z - LOG_SQRT_2PI - log_phi)    # phi(z) / Phi(z)
+    d_mu = 1 / tau - mills / sigma
+    d_sigma = sigma / tau ** 2 + mills * (-(x - mu) / sigma ** 2 - 1 / tau)
+    d_tau = -1 / tau - (mu - x) / tau ** 2 - sigma ** 2 / tau ** 3 + mills * sigma / tau ** 2
+    grad = np.array([d_mu.sum(), d_sigma.sum() * sigma, d_tau.sum() * tau])
+    return -ll.sum(), -grad
+
+
+def fit_cell(x):
+    '''(mu, sigma, tau, converged) of one array of RTs.'''
+    mu, sigma, tau = moments_start(x)
+    start = np.array([mu, np.log(sigma), np.log(tau)])
+    bounds = [(None, None), (np.log(MIN_SCALE), None), (np.log(MIN_SCALE), None)]
+    result = optimize.minimize(neg_loglik, start, args=(x,), jac=True, method="L-BFGS-B",
+                               bounds=bounds)
+    mu, log_sigma, log_tau = result.x
+    return mu, np.exp(log_sigma), np.exp(log_tau), bool(result.success)
+
+
+def fit_participant(df, min_trials=MIN_TRIALS):
+    '''Ex-Gaussian parameters of every cell of one participant with enough correct trials.'''
+    rows = []
+    for cell, rts in df.groupby(CELL, observed=True)['RT']:
+        x = rts.to_numpy(float)
+        fit = fit_cell(x) if len(x) >= min_trials else (np.nan, np.nan, np.nan, False)
+        rows.append(cell + (len(x),) + fit)
+    return pd.DataFrame(rows, columns=CELL + ['n', 'mu', 'sigma', 'tau', 'converged'])
+
+
+def exgauss_fits(trials, cache_dir=None, workers=None, min_trials=MIN_TRIALS):
+    '''mu, sigma and tau of correct-trial RTs per participant, module and condition.'''
+    df = trials.loc[(trials['Correct'] == 1) & trials['RT'].notna(), CELL + ['RT']]
+    df = df.astype({c: str for c in CELL})
+    fits = cache.per_participant(df, "exgauss", fit_participant, cache_dir, workers, min_trials)
+    if fits is None:
+        return pd.DataFrame(columns=CELL + ['n', 'mu', 'sigma', 'tau', 'converged'])
+    return fits
+
+
+def exgauss_summary(fits):
+    '''Mean mu, sigma and tau per module and condition over the fitted cells.'''
+    fitted = fits.dropna(subset=['mu'])
+    groups = fitted.groupby(['Module', 'Condition'])
+    summary = groups[['mu', 'sigma', 'tau']].mean()
+    summary.insert(0, 'cells', groups.size())
+    return summary.reset_index()
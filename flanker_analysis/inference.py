@@ -0,0 +1,94 @@
+''' Statistical tests of the notebook: ANOVAs, RT interference, survey links. '''
+
+import pandas as pd
+import statsmodels.api as sm
+from scipy import stats
+from statsmodels.formula.api import ols
+
+from .aggregate import EMOJI_MODULES
+from .effects import CONDITIONS, congruency_effects, paired_tests
+
+
+def _anova(formula, data):
+    return sm.stats.anova_lm(ols(formula, data=data).fit(), typ=2)
+
+
+def module_anovas(agg_df):
+    '''One-way ANOVAs on participant means: RT across modules, Emoji vs Letter+Emoji.'''
+    agg_df = agg_df.astype({'Module': str})    # C() would keep unused categorical levels
+    emoji_vs_combo = agg_df[agg_df['Module'].isin(EMOJI_MODULES)]
+    return {
+        "anova_rt_modules": _anova('mean_rt ~ C(Module)', agg_df),
+        "anova_acc_emoji_vs_combo": _anova('accuracy ~ C(Module)', emoji_vs_combo),
+        "anova_rt_emoji_vs_combo": _anova('mean_rt ~ C(Module)', emoji_vs_combo),
+    }
+
+
+def rt_summary(summaries):
+    '''Mean RT per condition and incongruent - congruent effect for each module.
+
+    Condition RTs are averages of participant means. The effect and its
+    p-value come from the paired, participant-level test in effects.py.
+    '''
+    effects = congruency_effects(summaries)
+    means = effects.groupby('Module', observed=True)[CONDITIONS].mean()
+    tests = paired_tests(effects)
+    tests = tests[tests['Effect'] == 'incongruent-congruent'].set_index('Module')
+
+    def rounded(values, digits, scale=1):
+        values = (values.reindex(means.index) * scale).round(digits)
+        return values.astype(object).where(values.notna(), None)
+
+    table = pd.DataFrame({
+        'Congruent RT (ms)': rounded(means['congruent'], 1, 1000),
+        'Incongruent RT (ms)': rounded(means['incongruent'], 1, 1000),
+        'Neutral RT (ms)': rounded(means['neutral'], 1, 1000),
+        'Effect Size (ms)': rounded(tests['mean_effect'], 1, 1000),
+        'p-value': rounded(tests['p'], 3),
+    })
+    table.index.name = 'Module'
+    return table.reset_index()
+
+
+SURVEY_COMPARISONS = [
+    # (label, survey score, RT column)
+    ("Familiarity vs Emoji RT", "Familiarity", "EmojiModule_AvgRT"),
+    ("Usage vs Emoji RT", "Usage", "EmojiModule_AvgRT"),
+    ("Empathy vs Letter+Emoji RT", "Empathy_Score", "LetterEmojiModule_AvgRT"),
+]
+KEY_COLUMNS = ["Familiarity", "Usage", "EmojiModule_AvgRT", "Empathy_Score", "LetterEmojiModule_AvgRT"]
+
+
+def rt_correlations(table, z_max=3):
+    '''Pearson correlations of survey scores with RT, after dropping |z| > z_max RT outliers.'''
+    clean = table.dropna(subset=KEY_COLUMNS).copy()
+    keep = pd.Series(True, index=clean.index)
+    for col in ["EmojiModule_AvgRT", "LetterEmojiModule_AvgRT"]:
+        z = (clean[col] - clean[col].mean()) / clean[col].std(ddof=0)
+        keep &= z.abs() <= z_max
+    clean = clean[keep]
+
+    rows = []
+    for label, score, rt in SURVEY_COMPARISONS:
+        r, p = stats.pearsonr(clean[score], clean[rt])
+        rows.append({"Comparison": label, "Correlation (r)": r, "p-value": p})
+    return pd.DataFrame(rows)
+
+
+def median_split_tests(table):
+    '''Welch t-tests of RT between high and low (median split) survey scores.'''
+    clean = table.dropna(subset=KEY_COLUMNS)
+    rows = []
+    for label, score, rt in SURVEY_COMPARISONS:
+        median = clean[score].median()
+        high = clean.loc[clean[score] > median, rt]
+        low = clean.loc[clean[score] <= median, rt]
+        t, p = stats.ttest_ind(high, low, equal_var=False)
+        rows.append({
+            "Comparison": label.replace(" vs ", " (High vs Low) - "),
+            "High Group Mean RT (ms)": high.mean(),
+            "Low Group Mean RT (ms)": low.mean(),
+            "t-value": t,
+            "p-value": p,
+        })
+    return pd.DataFrame(rows)
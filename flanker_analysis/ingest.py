@@ -0,0 +1,157 @@
+''' Load participant results and the post-task survey export.
+
+Results files are parsed in a process pool with a fixed dtype map (no type
+inference). Correct is normalised to bool and attention-check rows are
+flagged. The per-file frames are then concatenated with their categorical
+columns unified, so the codes are recoded instead of expanded to strings.
+'''
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from results_schema import HEADER, results_files
+
+ID_COLUMN = "Participant_ID"
+
+DTYPES = {
+    "Module": "category",
+    "Target/Check": "category",
+    "Condition": "category",
+    "Flanker": "category",
+    "Response": "category",
+    "Correct": "string",         # normalised to nullable boolean below
+    "RT": "float64",
+    "Onset": "float64",
+    "Offset": "float64",
+    "Frames": "Int16",
+    "Block": "Int16",
+    "Trial": "Int16",
+    "Sequence": "Int32",
+    "Prev_Condition": "category",
+    "Prev_Correct": "string",    # normalised to nullable boolean below
+    ID_COLUMN: "category",
+}
+BOOLS = {"true": True, "false": False, "1": True, "0": False}
+
+
+def to_bool(column):
+    '''Nullable booleans from True/False/1/0 in any case; blanks stay NA.'''
+    labels = column.astype("string").str.strip().str.lower()
+    values = labels.map(BOOLS)
+    bad = labels.notna() & (labels != "") & values.isna()
+    if bad.any():
+        raise ValueError(f"Unexpected {column.name} values: {sorted(set(column[bad]))[:5]}")
+    return values.astype("boolean")
+
+
+def conform(df):
+    '''Reorder to the current HEADER; columns of older schemas are added as typed NAs.'''
+    missing = [c for c in HEADER if c not in df]
+    return df.reindex(columns=HEADER).astype({c: DTYPES[c] for c in missing})
+
+
+def normalise(df):
+    '''Typed booleans and an is_attention flag for a freshly read frame.'''
+    df["Correct"] = to_bool(df["Correct"])
+    if "Prev_Correct" in df:
+        df["Prev_Correct"] = to_bool(df["Prev_Correct"])
+    df["is_attention"] = (df["Target/Check"] == "ATTENTION").to_numpy()
+    return df
+
+
+def participant_id(path):
+    '''Participant ID of a results file: its name without the extension.'''
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def read_results_file(path):
+    '''One participant's results file, with Participant_ID from the file name.
+
+    Returns (frame, seconds spent reading it).
+    '''
+    start = time.perf_counter()
+    df = pd.read_csv(path, comment="#", dtype=DTYPES)
+    df = conform(df)
+    df[ID_COLUMN] = pd.Categorical([participant_id(path)] * len(df))
+    df = normalise(df)
+    return df, time.perf_counter() - start
+
+
+def concat_frames(frames):
+    '''Concatenate frames, unifying categorical columns instead of falling back to object.'''
+    columns = frames[0].columns
+    categorical = [c for c in columns if isinstance(frames[0][c].dtype, pd.CategoricalDtype)
+                   and all(isinstance(f[c].dtype, pd.CategoricalDtype) for f in frames)]
+    out = pd.concat([f.drop(columns=categorical) for f in frames], ignore_index=True)
+    for c in categorical:
+        parts = [f[c] for f in frames]
+        # all-NA columns added by conform() have no categories (of any dtype) of their own
+        empty = next((p.cat.categories[:0] for p in parts if len(p.cat.categories)), None)
+        if empty is not None:
+            parts = [p if len(p.cat.categories) else p.cat.set_categories(empty) for p in parts]
+        out[c] = union_categoricals(parts)
+    return out[columns]
+
+
+def read_results_dir(results_dir, workers=None):
+    '''All results files of a directory, read in parallel.
+
+    Returns (trials, file_timings) where file_timings has one row per file.
+    '''
+    paths = list(results_files(results_dir))
+    if not paths:
+        raise FileNotFoundError(f"No results files in {results_dir}")
+    return read_results_files(paths, workers)
+
+
+def read_results_files(paths, workers=None):
+    '''The given results files, read in parallel; returns (trials, file_timings).'''
+    if workers == 1:
+        loaded = [read_results_file(p) for p in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            loaded = list(pool.map(read_results_file, paths, chunksize=max(len(paths) // 64, 1)))
+
+    timings = pd.DataFrame({
+        "file": [os.path.basename(p) for p in paths],
+        "rows": [len(df) for df, _ in loaded],
+        "seconds": [t for _, t in loaded],
+    })
+    return concat_frames([df for df, _ in loaded]), timings
+
+
+def load_trials(source, workers=None):
+    '''Trial table from a results directory or a combined CSV (build_combined.py).
+
+    Returns (trials, file_timings).
+    '''
+    if os.path.isdir(source):
+        return read_results_dir(source, workers)
+    start = time.perf_counter()
+    df = normalise(pd.read_csv(source, dtype=DTYPES))
+    timings = pd.DataFrame({"file": [os.path.basename(source)], "rows": [len(df)],
+                            "seconds": [time.perf_counter() - start]})
+    return df, timings
+
+
+def iter_chunks(source, chunksize=100000):
+    '''Typed frames of at most chunksize trials from a results directory or a combined CSV.'''
+    if not os.path.isdir(source):
+        for chunk in pd.read_csv(source, dtype=DTYPES, chunksize=chunksize):
+            yield normalise(chunk)
+        return
+    for path in results_files(source):
+        participant = participant_id(path)
+        for chunk in pd.read_csv(path, comment="#", dtype=DTYPES, chunksize=chunksize):
+            chunk = conform(chunk)
+            chunk[ID_COLUMN] = participant
+            yield normalise(chunk)
+
+
+def load_forms(path):
+    '''Google Forms export of the post-task survey.'''
+    return pd.read_csv(path)
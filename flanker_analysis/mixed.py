@@ -0,0 +1,73 @@
+''' Trial-level linear mixed models of RT with participant random intercepts.
+
+Fits RT ~ Condition * Module over all modules and RT ~ Condition within
+each module on correct trials. The models are independent, so they are
+fitted in a process pool. statsmodels' MixedLM works per participant
+block and never builds the dense trials x participants random-effects
+design. Each fit is cached under a hash of its data and formula.
+'''
+
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from statsmodels.formula.api import mixedlm
+
+from . import cache
+
+FULL_FORMULA = "RT ~ C(Condition, Treatment('congruent')) * C(Module)"
+MODULE_FORMULA = "RT ~ C(Condition, Treatment('congruent'))"
+
+
+def model_data(trials):
+    '''Correct trials with an RT, labels as plain strings for the formula.'''
+    df = trials.loc[(trials['Correct'] == 1) & trials['RT'].notna(),
+                    ['Participant_ID', 'Module', 'Condition', 'RT']]
+    df = df[df['Condition'].isin(['congruent', 'incongruent', 'neutral'])]
+    return df.astype({'Participant_ID': str, 'Module': str, 'Condition': str}).reset_index(drop=True)
+
+
+def fit_model(name, formula, data):
+    '''Fixed effects of one REML fit as a tidy frame.'''
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")     # convergence is reported in the table
+        result = mixedlm(formula, data, groups=data['Participant_ID']).fit(reml=True)
+    table = pd.DataFrame({
+        'model': name,
+        'term': result.fe_params.index,
+        'estimate': result.fe_params.to_numpy(),
+        'se': result.bse_fe.to_numpy(),
+        'z': result.tvalues[result.fe_params.index].to_numpy(),
+        'p': result.pvalues[result.fe_params.index].to_numpy(),
+    })
+    table['participants'] = data['Participant_ID'].nunique()
+    table['trials'] = len(data)
+    table['participant_var'] = float(result.cov_re.iloc[0, 0])
+    table['residual_var'] = result.scale
+    table['converged'] = result.converged
+    return table
+
+
+def _cached_fit(name, formula, data, cache_dir):
+    key = cache.frame_hash(data, formula)
+    table = cache.load(cache_dir, "mixed", key) if cache_dir else None
+    if table is None:
+        table = fit_model(name, formula, data)
+        if cache_dir:
+            cache.store(cache_dir, "mixed", key, table)
+    return table.assign(model=name)
+
+
+def mixed_models(trials, cache_dir=None, workers=None):
+    '''Fixed effects of the all-module model and of one model per module.'''
+    data = model_data(trials)
+    jobs = [("all modules", FULL_FORMULA, data)]
+    jobs += [(module, MODULE_FORMULA, mdf.reset_index(drop=True))
+             for module, mdf in data.groupby('Module') if mdf['Participant_ID'].nunique() > 1]
+    args = [list(column) for column in zip(*jobs)] + [[cache_dir] * len(jobs)]
+    if workers == 1:
+        tables = list(map(_cached_fit, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            tables = list(pool.map(_cached_fit, *args))
+    return pd.concat(tables, ignore_index=True)
@@ -0,0 +1,111 @@
+''' Permutation split-half reliability of the congruency effects.
+
+For every split, each participant's correct trials of a condition are
+divided at random into two halves of (nearly) equal size. The effect is
+computed in both halves and correlated across participants, and the
+correlation is stepped up with Spearman-Brown. Splits are boolean masks
+built in batch: a random key per trial, ranked within its row. They are
+drawn in chunks of CHUNK over a process pool, with one SeedSequence child
+per chunk, as in resample.py.
+'''
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .effects import EFFECTS
+from .resample import CHUNK, MAX_CELLS
+
+
+def trial_matrix(df, participants):
+    '''RTs as a participants x trials array (NaN padded) plus the trial count per row.'''
+    codes = pd.Categorical(df['Participant_ID'], categories=participants).codes
+    position = df.groupby(codes).cumcount().to_numpy()
+    counts = np.bincount(codes, minlength=len(participants))
+    rts = np.full((len(participants), max(counts.max(initial=0), 1)), np.nan)
+    rts[codes, position] = df['RT'].to_numpy(float)
+    return rts, counts
+
+
+def _half_means(rng, rts, counts, splits):
+    '''Means of the first and second random half of every row, for each split.'''
+    keys = rng.random((splits,) + rts.shape)
+    keys[:, np.isnan(rts)] = np.inf
+    rank = keys.argsort(axis=2).argsort(axis=2)
+    half = counts // 2
+    first = rank < half[:, None]
+    values = np.nan_to_num(rts)
+    total = values.sum(axis=1)
+    sum_a = (values * first).sum(axis=2)
+    return sum_a / half, (total - sum_a) / (counts - half)
+
+
+def _row_corr(a, b):
+    a = a - a.mean(axis=1, keepdims=True)
+    b = b - b.mean(axis=1, keepdims=True)
+    return (a * b).sum(axis=1) / np.sqrt((a * a).sum(axis=1) * (b * b).sum(axis=1))
+
+
+def _split_chunk(cells, splits, seed):
+    '''Split-half correlations of one chunk of splits, for every cell.'''
+    rng = np.random.default_rng(seed)
+    out = []
+    for (x, nx), (y, ny) in cells:
+        rows = max(MAX_CELLS // (x.size + y.size), 1)
+        r = np.empty(splits)
+        for start in range(0, splits, rows):
+            k = min(rows, splits - start)
+            xa, xb = _half_means(rng, x, nx, k)
+            ya, yb = _half_means(rng, y, ny, k)
+            r[start:start + k] = _row_corr(xa - ya, xb - yb)
+        out.append(r)
+    return out
+
+
+def split_half_reliability(trials, n_splits=5000, seed=0, workers=None, confidence=0.95):
+    '''Mean split-half r and Spearman-Brown reliability of each module's effects.
+
+    Uses correct trials only; participants with fewer than two such trials
+    in either condition of an effect are left out of it. workers=1 runs
+    serially.
+    '''
+    df = trials[(trials['Correct'] == 1) & trials['RT'].notna()]
+    keys, cells = [], []
+    for module, mdf in df.groupby('Module', observed=True):
+        for effect, conditions in EFFECTS.items():
+            by_condition = [mdf[mdf['Condition'] == c] for c in conditions]
+            counts = [d.groupby('Participant_ID', observed=True).size() for d in by_condition]
+            enough = (counts[0].reindex(counts[1].index, fill_value=0) >= 2) & (counts[1] >= 2)
+            participants = sorted(enough.index[enough])
+            if len(participants) < 3:
+                continue
+            keys.append((module, effect))
+            cells.append([trial_matrix(d[d['Participant_ID'].isin(participants)], participants)
+                          for d in by_condition])
+
+    chunks = [min(CHUNK, n_splits - i) for i in range(0, n_splits, CHUNK)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    args = ([cells] * len(chunks), chunks, seeds)
+    if workers == 1:
+        parts = list(map(_split_chunk, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_split_chunk, *args))
+
+    alpha = (1 - confidence) / 2
+    rows = []
+    for i, (module, effect) in enumerate(keys):
+        r = np.concatenate([part[i] for part in parts])
+        sb = 2 * r / (1 + r)
+        rows.append({
+            'Module': module,
+            'Effect': effect,
+            'n': len(cells[i][0][1]),
+            'splits': len(r),
+            'split_half_r': np.nanmean(r),
+            'spearman_brown': np.nanmean(sb),
+            'ci_low': np.nanquantile(sb, alpha),
+            'ci_high': np.nanquantile(sb, 1 - alpha),
+        })
+    return pd.DataFrame(rows)
@@ -0,0 +1,31 @@
+''' Write pipeline outputs to a report directory. '''
+
+import os
+
+import pandas as pd
+
+try:
+    from tabulate import tabulate
+except ImportError:     # plain-text tables without it
+    tabulate = None
+
+
+def format_table(df):
+    if tabulate is not None:
+        return tabulate(df, headers="keys", tablefmt="fancy_grid", showindex=False)
+    return df.to_string(index=False)
+
+
+def write_report(tables, out_dir):
+    '''Save every table as <name>.csv and all of them in report.txt.'''
+    os.makedirs(out_dir, exist_ok=True)
+    sections = []
+    for name, df in tables.items():
+        index = not isinstance(df.index, pd.RangeIndex)
+        df.to_csv(os.path.join(out_dir, f"{name}.csv"), index=index)
+        shown = df.reset_index() if index else df
+        sections.append(f"=== {name} ===\n{format_table(shown)}\n")
+    path = os.path.join(out_dir, "report.txt")
+    with open(path, "w") as f:
+        f.write("\n".join(sections))
+    return path
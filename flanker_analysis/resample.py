@@ -0,0 +1,81 @@
+''' Bootstrap CIs and sign-flip permutation p-values for the congruency effects.
+
+The unit resampled is the participant. Replicates are drawn in chunks of
+CHUNK. Each chunk is one index matrix (bootstrap) and one sign matrix
+(permutation) over every participant's difference. Every chunk gets its
+own child of SeedSequence(seed), so the result depends on the seed and
+not on how many worker processes the chunks were spread over.
+'''
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .effects import EFFECTS
+
+CHUNK = 1000           # replicates per task
+MAX_CELLS = 1 << 22    # elements per index / sign matrix block
+
+
+def _replicates(diffs, n_boot, n_perm, seed):
+    '''Bootstrap means and permutation exceedance counts of one chunk, for every vector.'''
+    boot_rng, perm_rng = (np.random.default_rng(s) for s in seed.spawn(2))
+    boots, exceed = [], []
+    for d in diffs:
+        n = len(d)
+        rows = max(MAX_CELLS // max(n, 1), 1)
+        observed = abs(d.mean())
+
+        means = np.empty(n_boot)
+        for start in range(0, n_boot, rows):
+            idx = boot_rng.integers(0, n, size=(min(rows, n_boot - start), n))
+            means[start:start + len(idx)] = d[idx].mean(axis=1)
+
+        count = 0
+        for start in range(0, n_perm, rows):
+            signs = perm_rng.choice((-1.0, 1.0), size=(min(rows, n_perm - start), n))
+            count += int((np.abs(signs @ d) / n >= observed - 1e-12).sum())
+        boots.append(means)
+        exceed.append(count)
+    return boots, exceed
+
+
+def resample_effects(effects, n_boot=5000, n_perm=5000, seed=0, workers=None, confidence=0.95):
+    '''Percentile bootstrap CI and sign-flip permutation p of each module's effects.
+
+    effects is the output of congruency_effects(). workers=1 runs serially.
+    '''
+    long = effects.melt(id_vars=['Participant_ID', 'Module'], value_vars=list(EFFECTS),
+                        var_name='Effect', value_name='diff').dropna(subset=['diff'])
+    groups = long.groupby(['Module', 'Effect'], observed=True)['diff']
+    keys = list(groups.groups)
+    diffs = [groups.get_group(k).to_numpy(float) for k in keys]
+
+    total = max(n_boot, n_perm)
+    chunks = [(min(CHUNK, max(n_boot - i, 0)), min(CHUNK, max(n_perm - i, 0)))
+              for i in range(0, total, CHUNK)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    args = ([diffs] * len(chunks), [b for b, _ in chunks], [p for _, p in chunks], seeds)
+    if workers == 1:
+        parts = list(map(_replicates, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_replicates, *args))
+
+    alpha = (1 - confidence) / 2
+    rows = []
+    for i, (module, effect) in enumerate(keys):
+        boots = np.concatenate([boots[i] for boots, _ in parts])
+        exceed = sum(exceed[i] for _, exceed in parts)
+        rows.append({
+            'Module': module,
+            'Effect': effect,
+            'n': len(diffs[i]),
+            'mean_effect': diffs[i].mean(),
+            'boot_se': boots.std(ddof=1) if n_boot > 1 else np.nan,
+            'ci_low': np.quantile(boots, alpha) if n_boot else np.nan,
+            'ci_high': np.quantile(boots, 1 - alpha) if n_boot else np.nan,
+            'p_perm': (exceed + 1) / (n_perm + 1) if n_perm else np.nan,
+        })
+    return pd.DataFrame(rows)
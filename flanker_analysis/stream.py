@@ -0,0 +1,125 @@
+''' Out-of-core aggregation: participant summaries from a stream of chunks.
+
+The trial table is read in chunks (ingest.iter_chunks) and never held
+whole. Each chunk is reduced to per-cell accumulators: trial, scored and
+correct counts, plus count, mean and M2 (sum of squared deviations,
+Welford) of RT over all trials and over correct trials. Accumulators are
+merged with the k-way form of Chan et al.'s update, which is exact up to
+rounding. Memory grows with the number of participant x module x
+condition cells, not with the number of trials.
+
+Medians are not mergeable, so the streamed summaries have no median
+columns. Cell-level trimming needs whole cells, so only the absolute
+RT cutoffs apply.
+'''
+
+import numpy as np
+import pandas as pd
+
+from .clean import clean_trials
+from .diffusion import ez_from_stats
+from .ingest import iter_chunks
+
+CELL = ['Participant_ID', 'Module', 'Condition']
+MOMENTS = ("rt", "crt")    # RT of all trials, RT of correct trials
+
+
+def chunk_accumulators(chunk):
+    '''Per-cell accumulators of one chunk of cleaned trials.'''
+    df = chunk.loc[~chunk['is_attention'], CELL + ['Correct', 'RT']]
+    df = df.astype({c: str for c in CELL})
+    df['crt'] = df['RT'].where((df['Correct'] == 1).fillna(False))
+    groups = df.groupby(CELL)
+    acc = groups.agg(trials=('Correct', 'size'), scored=('Correct', 'count'),
+                     correct=('Correct', 'sum'))
+    # trials EZ-diffusion can use: an RT and a Correct value
+    usable = df['RT'].notna() & df['Correct'].notna()
+    acc['ez_n'] = usable.groupby([df[c] for c in CELL]).sum()
+    for name, column in zip(MOMENTS, ('RT', 'crt')):
+        n = groups[column].count()
+        acc[f"{name}_n"] = n
+        acc[f"{name}_mean"] = groups[column].mean().fillna(0.0)
+        acc[f"{name}_m2"] = (groups[column].var(ddof=0) * n).fillna(0.0)
+    return acc.reset_index()
+
+
+def merge_accumulators(parts):
+    '''Exact combination of accumulator frames (cells as columns) whose cells may repeat.
+
+    The k-way form of Chan et al.'s update: with n = sum(n_i) and
+    mean = sum(n_i * mean_i) / n, M2 = sum(M2_i + n_i * (mean_i - mean)^2).
+    '''
+    df = pd.concat(parts, ignore_index=True)
+    ids = df.groupby(CELL, sort=False).ngroup().to_numpy()    # grouped once, summed with bincount
+    first = np.unique(ids, return_index=True)[1]
+
+    def total(values):
+        return np.bincount(ids, weights=values, minlength=len(first))
+
+    out = df.loc[first, CELL].reset_index(drop=True)
+    for column in ('trials', 'scored', 'correct', 'ez_n'):
+        out[column] = total(df[column].to_numpy(float)).astype(np.int64)
+    for name in MOMENTS:
+        n_i, mean_i = df[f"{name}_n"].to_numpy(float), df[f"{name}_mean"].to_numpy()
+        n = total(n_i)
+        mean = total(n_i * mean_i) / np.where(n > 0, n, 1)
+        deviation = mean_i - mean[ids]
+        out[f"{name}_n"] = n.astype(np.int64)
+        out[f"{name}_mean"] = mean
+        out[f"{name}_m2"] = total(df[f"{name}_m2"].to_numpy() + n_i * deviation ** 2)
+    return out
+
+
+def accumulate(source, chunksize=100000, min_rt=None, max_rt=None):
+    '''Accumulators of every cell in source, one chunk at a time.
+
+    Chunk accumulators are buffered and merged whenever they add up to
+    chunksize rows, so memory stays at about one chunk plus the cells.
+    '''
+    acc, pending, pending_rows = [], [], 0
+    for chunk in iter_chunks(source, chunksize):
+        chunk = clean_trials(chunk)
+        if min_rt is not None:
+            chunk = chunk[~(chunk['RT'] < min_rt)]
+        if max_rt is not None:
+            chunk = chunk[~(chunk['RT'] > max_rt)]
+        part = chunk_accumulators(chunk)
+        pending.append(part)
+        pending_rows += len(part)
+        if pending_rows >= chunksize:
+            acc, pending, pending_rows = [merge_accumulators(acc + pending)], [], 0
+    if not acc and not pending:
+        raise ValueError(f"No trials in {source}")
+    return merge_accumulators(acc + pending).sort_values(CELL, ignore_index=True)
+
+
+def _moment(acc, name):
+    n = acc[f"{name}_n"]
+    mean = acc[f"{name}_mean"].where(n > 0)
+    var = (acc[f"{name}_m2"] / (n - 1)).where(n > 1)
+    return mean, var
+
+
+def stream_summaries(acc):
+    '''Summary rows like aggregate.summarise(), without the median columns.'''
+    rt_mean, rt_var = _moment(acc, "rt")
+    return acc[CELL].assign(
+        trials=acc['trials'],
+        scored=acc['scored'],
+        correct=acc['correct'],
+        accuracy=(acc['correct'] / acc['scored']).where(acc['scored'] > 0),
+        mean_rt=rt_mean,
+        rt_var=rt_var,
+    )
+
+
+def stream_ez(acc):
+    '''EZ-diffusion estimates from the accumulators (same cells as diffusion.cell_stats).'''
+    crt_mean, crt_var = _moment(acc, "crt")
+    cells = acc[CELL].assign(
+        n=acc['ez_n'],
+        accuracy=acc['crt_n'] / acc['ez_n'],
+        mrt=crt_mean,
+        vrt=crt_var,
+    )
+    return ez_from_stats(cells[cells['n'] > 0].reset_index(drop=True))
@@ -0,0 +1,125 @@
+''' Trial-level RT trimming.
+
+Three rules can be combined, applied in order:
+
+  absolute   drop RTs below min_rt or above max_rt (anticipations, lapses)
+  sd / mad   drop RTs more than `criterion` SDs (or scaled MADs) from their
+             participant x module x condition cell mean (median)
+  recursive  Van Selst & Jolicoeur (1994) modified recursive trimming
+             with a moving criterion: per cell, the largest trial is set
+             aside, and the largest and smallest are dropped if they lie
+             beyond mean +/- c(n) SD of the rest. Repeat until nothing is
+             dropped. c(n) grows with the cell size n.
+
+All rules are grouped vectorized operations. The recursive rule loops
+over passes, never over cells or trials. Attention checks (is_attention)
+and rows without an RT are never trimmed.
+'''
+
+import numpy as np
+import pandas as pd
+
+CELL = ['Participant_ID', 'Module', 'Condition']
+METHODS = ("none", "sd", "mad", "recursive")
+MAD_SCALE = 1.4826    # MAD -> SD for normal data
+
+# modified recursive criterion of Van Selst & Jolicoeur (1994), by cell size
+CRITERION_N = [4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 20, 25, 30, 35, 50, 100]
+CRITERION_C = [8, 6.2, 5.3, 4.8, 4.475, 4.25, 4.11, 4, 3.92, 3.85, 3.8, 3.75, 3.64, 3.595, 3.55,
+               3.54, 3.52, 3.5]
+
+
+def moving_criterion(n):
+    return np.interp(n, CRITERION_N, CRITERION_C)
+
+
+def cell_outliers(trials, method, criterion=2.5):
+    '''Boolean mask of trials beyond criterion SDs / scaled MADs of their cell.'''
+    rt = trials['RT']
+    groups = rt.groupby([trials[c] for c in CELL], observed=True)
+    if method == "sd":
+        centre, spread = groups.transform('mean'), groups.transform('std')
+    else:
+        centre = groups.transform('median')
+        spread = (rt - centre).abs().groupby([trials[c] for c in CELL], observed=True) \
+            .transform('median') * MAD_SCALE
+    return ((rt - centre).abs() > criterion * spread).fillna(False).to_numpy(bool)
+
+
+def recursive_outliers(trials):
+    '''Boolean mask of trials removed by moving-criterion recursive trimming.'''
+    rt = trials['RT'].to_numpy(float)
+    cell = trials.groupby(CELL, observed=True, dropna=True).ngroup().to_numpy()
+    usable = (cell >= 0) & ~np.isnan(rt)
+
+    # sorted by cell then RT, every cell's surviving trials stay one
+    # contiguous range [lo, hi]: only its extremes are ever removed
+    order = np.flatnonzero(usable)[np.lexsort((rt[usable], cell[usable]))]
+    x, g = rt[order], cell[order]
+    cells = np.unique(g)
+    lo = np.searchsorted(g, cells, side='left')
+    hi = np.searchsorted(g, cells, side='right') - 1
+    total = np.add.reduceat(x, lo) if len(x) else np.zeros(0)
+    squares = np.add.reduceat(x * x, lo) if len(x) else np.zeros(0)
+
+    while True:
+        # mean and SD of each cell without its largest trial; both extremes
+        # are judged against them
+        n = hi - lo + 1
+        m = n - 1
+        mean = (total - x[hi]) / np.maximum(m, 1)
+        var = (squares - x[hi] ** 2 - m * mean ** 2) / np.maximum(m - 1, 1)
+        cutoff = moving_criterion(n) * np.sqrt(np.maximum(var, 0))
+        live = n >= 4
+        high = live & (x[hi] > mean + cutoff)
+        low = live & (x[lo] < mean - cutoff)
+        if not (high.any() or low.any()):
+            break
+        for drop, ptr in ((high, hi), (low, lo)):
+            values = np.where(drop, x[ptr], 0.0)
+            total -= values
+            squares -= values ** 2
+        hi = hi - high
+        lo = lo + low
+
+    span = np.zeros(len(x) + 1, int)
+    np.add.at(span, lo, 1)
+    np.add.at(span, hi + 1, -1)
+    kept = np.cumsum(span[:-1]) > 0
+    removed = np.zeros(len(rt), bool)
+    removed[order[~kept]] = True
+    return removed
+
+
+def trim_trials(trials, min_rt=None, max_rt=None, method="none", criterion=2.5):
+    '''Trials left after trimming, and the removals per participant.
+
+    Returns (kept trials, report) where report has the trial count and
+    the trials removed by each rule for every participant.
+    '''
+    if method not in METHODS:
+        raise ValueError(f"Unknown trimming method {method!r}, expected one of {METHODS}")
+    rt = trials['RT']
+    absolute = np.zeros(len(trials), bool)
+    if min_rt is not None:
+        absolute |= (rt < min_rt).to_numpy(bool)
+    if max_rt is not None:
+        absolute |= (rt > max_rt).to_numpy(bool)
+    absolute &= ~trials['is_attention'].to_numpy(bool)
+
+    outlier = np.zeros(len(trials), bool)
+    if method != "none":
+        rest = trials[~absolute]
+        mask = recursive_outliers(rest) if method == "recursive" else \
+            cell_outliers(rest, method, criterion)
+        outlier[np.flatnonzero(~absolute)[mask]] = True
+
+    report = pd.DataFrame({
+        'Participant_ID': trials['Participant_ID'].to_numpy(),
+        'trials': 1,
+        'removed_absolute': absolute,
+        'removed_outlier': outlier,
+    }).groupby('Participant_ID', observed=True).sum()
+    report['removed_total'] = report['removed_absolute'] + report['removed_outlier']
+    report['removed_pct'] = 100 * report['removed_total'] / report['trials']
+    return trials[~(absolute | outlier)], report.reset_index()
@@ -3,13 +3,33 @@ import random
 import time
 import csv
 import os
+import json
+import math
+from collections import deque, OrderedDict
 from datetime import datetime
 
+from results_schema import HEADER, SCHEMA_VERSION
+from results_writer import ResultsWriter
+from results_db import open_db, write_block
+from results_npz import export_npz
+from input_log import EventLog
+from session_meta import (file_hash, config_hash, measure_refresh,
+                          build_meta, write_meta, load_meta)
+from session_journal import (new_journal, load_journal, save_journal,
+                             count_rows, resume_point)
+
 # -------------------- CONFIG --------------------
 SCREEN_W, SCREEN_H = 1000, 600
 BG_COLOR = (255, 255, 255)
 TRIALS = 30
-PRACTICE_TRIALS = 6
+PRACTICE_TRIALS = 6          # answered trials per practice mini-block
+PRACTICE_CRITERION = 0.8     # rolling accuracy needed to leave practice
+PRACTICE_WINDOW = 6          # most recent practice trials the criterion looks at
+PRACTICE_MAX_BLOCKS = 3      # cap on mini-blocks (1 = single fixed practice block)
+LOG_PRACTICE = True          # write practice trials to {participant}_practice.csv
+
+RESULTS_DB = None            # shared SQLite results database, e.g. "results.db" (None = CSV only)
+EXPORT_NPZ = True            # also save a typed columnar {participant}.npz (needs numpy)
 
 FIX_MS = 500        # fixation cross before each trial
 STIM_MS = 1500      # time stimulus is visible (fixed)
@@ -19,14 +39,41 @@ STIM_SIZE = 150
 FPS = 60
 FONT_SIZE = 48
 
+# flanker array layout
+FLANKERS_PER_SIDE = 1        # 1 -> three-item array, 2 -> five-item array
+LAYOUT = "horizontal"        # "horizontal" or "vertical"
+SPACING_PX = 200             # centre-to-centre spacing of image items
+SPACING_DEG = None           # spacing in degrees of visual angle (overrides SPACING_PX)
+VIEWING_DISTANCE_CM = 60
+SCREEN_WIDTH_CM = 34.5       # physical width of SCREEN_W pixels of the display
+ARRAY_CACHE_SIZE = 64        # composited arrays kept per module
+
+# brief exposure + backward mask
+STIM_FRAMES = None           # frames the array is shown before the mask (None = until response)
+MASK_CELL = 10               # size of the noise squares in the mask
+VSYNC = True                 # sync flips to the display refresh when STIM_FRAMES is set
+
 pygame.init()
-screen = pygame.display.set_mode((SCREEN_W, SCREEN_H))
+vsync_active = False
+# vsync needs pygame.SCALED, which enlarges the window by a whole-number
+# factor on large desktops, so it is only requested for brief exposure
+if VSYNC and STIM_FRAMES is not None:
+    try:
+        screen = pygame.display.set_mode((SCREEN_W, SCREEN_H), pygame.SCALED, vsync=1)
+        vsync_active = True
+    except pygame.error:
+        print("⚠️ VSync not available, pacing frames with the clock")
+if not vsync_active:
+    screen = pygame.display.set_mode((SCREEN_W, SCREEN_H))
 pygame.display.set_caption("Cognitive Science Experiment")
 clock = pygame.time.Clock()
 font = pygame.font.Font(None, FONT_SIZE)
 small_font = pygame.font.Font(None, 28)
+letter_font = pygame.font.Font(None, STIM_SIZE)
 
 # -------------------- LOAD STIMULI --------------------
+asset_hashes = {}   # path -> sha256 of every stimulus file loaded
+
 def load_images(folder, names):
     imgs = {}
     for name in names:
@@ -34,56 +81,72 @@ def load_images(folder, names):
         if not os.path.exists(path):
             print(f"⚠️ Missing image: {path}")
             continue
+        asset_hashes[path] = file_hash(path)
         img = pygame.image.load(path).convert_alpha()
         img = pygame.transform.smoothscale(img, (STIM_SIZE, STIM_SIZE))
         imgs[name] = img
     return imgs
 
-emoji_imgs = load_images("emoticons", [
-    "happy_1", "happy_2", "sad_1", "sad_2", "neutral_1", "neutral_2"
-])
-shape_imgs = load_images("shapes", [
-    "square", "heart", "circle", "triangle", "star", "pentagon"
-])
-
 # -------------------- MODULE DEFINITIONS --------------------
-modules = [
-    {
-        "name": "Letter Module",
-        "type": "text",
-        "left_group": ["A", "B"],
-        "right_group": ["C", "D"],
-        "neutral": ["X", "Y"]
-    },
-    {
-        "name": "Emoji Module",
-        "type": "image",
-        "left_group": ["happy_1", "happy_2"],
-        "right_group": ["sad_1", "sad_2"],
-        "neutral": ["neutral_1", "neutral_2"],
-        "img_dict": emoji_imgs
-    },
-    {
-        "name": "Shape Module",
-        "type": "image",
-        "left_group": ["square", "pentagon"],
-        "right_group": ["circle", "triangle"],
-        "neutral": ["heart", "star"],
-        "img_dict": shape_imgs
-    },
-    {
-        "name": "Letter+Emoji Module",
-        "type": "mixed",
-        "left_group": ["happy_1", "happy_2"],
-        "right_group": ["sad_1", "sad_2"],
-        "neutral": ["neutral_1", "neutral_2"],
-        "img_dict": emoji_imgs,
-        "letters": ["H", "S", "X"]
+MODULES_FILE = "modules.json"
+CONDITIONS = ("congruent", "incongruent", "neutral")
+
+def compile_module(spec, image_sets):
+    # turn a module spec into constant-time lookup tables used by run_trial
+    module = dict(spec)
+    left, right = tuple(spec["left_group"]), tuple(spec["right_group"])
+    neutral = tuple(spec["neutral"])
+    module["targets"] = left + right
+    module["side"] = {**{s: 0 for s in left}, **{s: 1 for s in right}}
+    module["flankers"] = {
+        (0, "congruent"): left, (0, "incongruent"): right, (0, "neutral"): neutral,
+        (1, "congruent"): right, (1, "incongruent"): left, (1, "neutral"): neutral,
     }
-]
+
+    surfaces = {}
+    if module["type"] == "text":
+        for s in left + right + neutral:
+            surfaces[s] = font.render(s, True, (0, 0, 0))
+    else:
+        module["img_dict"] = image_sets[spec["images"]]
+        surfaces.update(module["img_dict"])
+    for letter in spec.get("letters", []):
+        surfaces[letter] = letter_font.render(letter, True, (0, 0, 0))
+    module["surfaces"] = surfaces
+    return module
+
+def load_modules(path):
+    with open(path) as f:
+        specs = json.load(f)["modules"]
+    asset_hashes[path] = file_hash(path)
+
+    # one load per image folder, covering every stimulus that uses it
+    wanted = {}
+    for spec in specs:
+        if "images" in spec:
+            names = wanted.setdefault(spec["images"], [])
+            for name in spec["left_group"] + spec["right_group"] + spec["neutral"]:
+                if name not in names:
+                    names.append(name)
+    image_sets = {folder: load_images(folder, names) for folder, names in wanted.items()}
+
+    return [compile_module(spec, image_sets) for spec in specs]
+
+modules = load_modules(MODULES_FILE)
 
 key_map = {pygame.K_LEFT: 0, pygame.K_RIGHT: 1}
 
+# -------------------- EVENTS --------------------
+event_log = None    # EventLog of the running session
+
+def poll_events():
+    events = pygame.event.get()
+    if event_log is not None and events:
+        t = time.perf_counter() - session_start
+        for e in events:
+            event_log.log(e, t)
+    return events
+
 # -------------------- DRAW FUNCTIONS --------------------
 def draw_text_center(text, y, font_obj=font):
     render = font_obj.render(text, True, (0, 0, 0))
@@ -97,24 +160,126 @@ def draw_image_center(img, img_dict, y=None, x=None):
     rect = image.get_rect(center=(x, y))
     screen.blit(image, rect)
 
-def draw_mixed_triplet(center_img, flank_letter, img_dict):
-    spacing = 200
-    y = SCREEN_H // 2
-    letter_font = pygame.font.Font(None, STIM_SIZE)
-    left_text = letter_font.render(flank_letter, True, (0, 0, 0))
-    right_text = letter_font.render(flank_letter, True, (0, 0, 0))
-    rect_l = left_text.get_rect(center=(SCREEN_W // 2 - spacing, y))
-    rect_r = right_text.get_rect(center=(SCREEN_W // 2 + spacing, y))
-    rect_c = img_dict[center_img].get_rect(center=(SCREEN_W // 2, y))
-    screen.blit(left_text, rect_l)
-    screen.blit(img_dict[center_img], rect_c)
-    screen.blit(right_text, rect_r)
-
 def draw_small_image_centered(img_key, img_dict, x, y, size=80):
     img = pygame.transform.smoothscale(img_dict[img_key], (size, size))
     rect = img.get_rect(center=(x, y))
     screen.blit(img, rect)
 
+# -------------------- LAYOUT ENGINE --------------------
+def deg_to_px(deg):
+    # logical pixels; under pygame.SCALED each one spans several display pixels
+    size_cm = 2 * VIEWING_DISTANCE_CM * math.tan(math.radians(deg) / 2)
+    scale = pygame.display.get_window_size()[0] / SCREEN_W
+    return round(size_cm * SCREEN_W / SCREEN_WIDTH_CM / scale)
+
+def array_spacing(module):
+    if SPACING_DEG is not None:
+        return deg_to_px(SPACING_DEG)
+    if module["type"] == "text":
+        # same letter spacing as the old "F   T   F" string
+        return font.size("A   ")[0]
+    return SPACING_PX
+
+def item_surface(module, key):
+    return module["surfaces"][key]
+
+def array_geometry(module, item_w, item_h):
+    # surface size of the whole array and the centre of each item in it
+    n = 2 * FLANKERS_PER_SIDE + 1
+    spacing = array_spacing(module)
+    if LAYOUT == "vertical":
+        size = (item_w, (n - 1) * spacing + item_h)
+        centers = [(item_w // 2, item_h // 2 + i * spacing) for i in range(n)]
+    else:
+        size = ((n - 1) * spacing + item_w, item_h)
+        centers = [(item_w // 2 + i * spacing, item_h // 2) for i in range(n)]
+    return size, centers
+
+def compose_array(module, target, flanker):
+    flank = item_surface(module, flanker)
+    items = [flank] * FLANKERS_PER_SIDE + [item_surface(module, target)] + [flank] * FLANKERS_PER_SIDE
+    item_w = max(item.get_width() for item in items)
+    item_h = max(item.get_height() for item in items)
+    size, centers = array_geometry(module, item_w, item_h)
+
+    surface = pygame.Surface(size, pygame.SRCALPHA)
+    for item, center in zip(items, centers):
+        surface.blit(item, item.get_rect(center=center))
+    return surface.convert_alpha()
+
+def compose_mask(module):
+    # opaque noise patches over every item position, sized to cover the
+    # largest array of the module so swapping it in is a single blit
+    keys = array_keys(module)
+    items = [item_surface(module, t) for t, _ in keys] + \
+            [item_surface(module, f) for _, f in keys]
+    item_w = max(item.get_width() for item in items)
+    item_h = max(item.get_height() for item in items)
+    size, centers = array_geometry(module, item_w, item_h)
+
+    rng = random.Random(module["name"])  # keep the trial sequence untouched
+    mask = pygame.Surface(size)
+    mask.fill(BG_COLOR)
+    for center in centers:
+        patch = pygame.Rect(0, 0, item_w, item_h)
+        patch.center = center
+        for x in range(patch.left, patch.right, MASK_CELL):
+            for y in range(patch.top, patch.bottom, MASK_CELL):
+                shade = rng.choice((0, 128, 255))
+                cell = pygame.Rect(x, y, MASK_CELL, MASK_CELL).clip(patch)
+                mask.fill((shade, shade, shade), cell)
+    return mask.convert()
+
+def array_keys(module):
+    if module["type"] == "mixed":
+        flankers = module["letters"]
+    else:
+        flankers = module["left_group"] + module["right_group"] + module["neutral"]
+    return [(t, f) for t in module["targets"] for f in flankers]
+
+def prepare_arrays(module):
+    # pre-composite every target/flanker array, up to ARRAY_CACHE_SIZE
+    cache = OrderedDict()
+    for key in array_keys(module)[:ARRAY_CACHE_SIZE]:
+        cache[key] = compose_array(module, *key)
+    module["arrays"] = cache
+    if STIM_FRAMES is not None:
+        module["mask"] = compose_mask(module)
+
+def release_arrays(module):
+    module.pop("arrays", None)
+    module.pop("mask", None)
+
+def get_array(module, target, flanker):
+    cache = module.setdefault("arrays", OrderedDict())
+    key = (target, flanker)
+    surface = cache.get(key)
+    if surface is None:
+        surface = compose_array(module, target, flanker)
+        cache[key] = surface
+        if len(cache) > ARRAY_CACHE_SIZE:
+            cache.popitem(last=False)
+    else:
+        cache.move_to_end(key)
+    return surface
+
+def draw_array(module, target, flanker):
+    surface = get_array(module, target, flanker)
+    screen.blit(surface, surface.get_rect(center=(SCREEN_W // 2, SCREEN_H // 2)))
+
+def draw_mask(module):
+    mask = module.get("mask")
+    if mask is None:
+        mask = module["mask"] = compose_mask(module)
+    screen.blit(mask, mask.get_rect(center=(SCREEN_W // 2, SCREEN_H // 2)))
+
+def next_frame():
+    # with vsync the flip itself waits for the refresh
+    if not vsync_active:
+        clock.tick(FPS)
+    pygame.display.flip()
+    return time.perf_counter() - session_start
+
 # -------------------- INSTRUCTION SCREENS --------------------
 def instruction_screen():
     lines = [
@@ -141,7 +306,7 @@ def instruction_screen():
 
     waiting = True
     while waiting:
-        for event in pygame.event.get():
+        for event in poll_events():
             if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
                 waiting = False
         clock.tick(FPS)
@@ -155,67 +320,33 @@ def module_instructions(module):
         rect = render.get_rect(center=(SCREEN_W // 2, y))
         screen.blit(render, rect)
 
-    bottom_y = SCREEN_H - 60
-
-    if module["name"] == "Letter Module":
-        draw_small_text_center("Text-based Task:", 100)
-        draw_small_text_center("You will be shown three letters.", 150)
-        draw_small_text_center("If the letter in the middle is A or B, press the < - key", 220)
-        draw_small_text_center("If the letter in the middle is C or D, press the - > key", 260)
-        bottom_y = 320
-
-    elif module["name"] == "Emoji Module":
-        draw_small_text_center("Emoji-based Task:", 100)
-        draw_small_text_center("You will be shown three emojis.", 150)
-        draw_small_text_center("If the emoji in the middle is:", 220)
-        draw_small_image_centered("happy_1", emoji_imgs, SCREEN_W // 2 - 100, 280)
-        draw_small_image_centered("happy_2", emoji_imgs, SCREEN_W // 2 + 100, 280)
-        draw_small_text_center("Press the < - key", 340)
-        draw_small_text_center("If the emoji in the middle is:", 420)
-        draw_small_image_centered("sad_1", emoji_imgs, SCREEN_W // 2 - 100, 480)
-        draw_small_image_centered("sad_2", emoji_imgs, SCREEN_W // 2 + 100, 480)
-        draw_small_text_center("Press the - > key", 560)
-        bottom_y = 610
-
-    elif module["name"] == "Shape Module":
-        draw_small_text_center("Shape-based Task:", 100)
-        draw_small_text_center("You will be shown three shapes.", 150)
-        draw_small_text_center("If the shape in the middle is:", 220)
-        draw_small_image_centered("square", shape_imgs, SCREEN_W // 2 - 100, 280)
-        draw_small_image_centered("pentagon", shape_imgs, SCREEN_W // 2 + 100, 280)
-        draw_small_text_center("Press the < - key", 340)
-        draw_small_text_center("If the shape in the middle is:", 420)
-        draw_small_image_centered("circle", shape_imgs, SCREEN_W // 2 - 100, 480)
-        draw_small_image_centered("triangle", shape_imgs, SCREEN_W // 2 + 100, 480)
-        draw_small_text_center("Press the - > key", 560)
-        bottom_y = 610
-
-    elif module["name"] == "Letter+Emoji Module":
-        draw_small_text_center("Emoji + Text-based Task:", 100)
-        draw_small_text_center("You will be shown three characters.", 150)
-        draw_small_text_center("Focus on the emoji in the middle.", 190)
-        draw_small_text_center("If the emoji in the middle is:", 240)
-        draw_small_image_centered("happy_1", emoji_imgs, SCREEN_W // 2 - 100, 300)
-        draw_small_image_centered("happy_2", emoji_imgs, SCREEN_W // 2 + 100, 300)
-        draw_small_text_center("Press the < - key", 360)
-        draw_small_text_center("If the emoji in the middle is:", 440)
-        draw_small_image_centered("sad_1", emoji_imgs, SCREEN_W // 2 - 100, 500)
-        draw_small_image_centered("sad_2", emoji_imgs, SCREEN_W // 2 + 100, 500)
-        draw_small_text_center("Press the - > key", 560)
-        bottom_y = 610
+    for item in module["instructions"]:
+        if "text" in item:
+            draw_small_text_center(item["text"], item["y"])
+        else:
+            n = len(item["images"])
+            for i, img_key in enumerate(item["images"]):
+                x = SCREEN_W // 2 + round((i - (n - 1) / 2) * 200)
+                draw_small_image_centered(img_key, module["img_dict"], x, item["y"])
+    bottom_y = module.get("prompt_y", SCREEN_H - 60)
 
     draw_small_text_center("Press SPACE to begin", bottom_y)
     pygame.display.flip()
 
     waiting = True
     while waiting:
-        for e in pygame.event.get():
+        for e in poll_events():
             if e.type == pygame.KEYDOWN and e.key == pygame.K_SPACE:
                 waiting = False
         clock.tick(FPS)
 
 # -------------------- TRIAL FUNCTION --------------------
-def run_trial(module, record=False, results=None, forced_condition=None):
+def run_trial(module, record=False, results=None, forced_condition=None, trial_info=None):
+    # trial_info: [block, trial, sequence, previous condition, previous correct],
+    # appended to the recorded row
+    if trial_info is None:
+        trial_info = ["", "", "", "", ""]
+
     # ---------------- ATTENTION CHECK ----------------
     if forced_condition is None and random.random() < 0.05:
         screen.fill(BG_COLOR)
@@ -225,104 +356,262 @@ def run_trial(module, record=False, results=None, forced_condition=None):
         start = time.time()
         clicked, rt = False, None
         while time.time() - start < 3:
-            for e in pygame.event.get():
+            for e in poll_events():
                 if e.type == pygame.MOUSEBUTTONDOWN:
                     mx, my = pygame.mouse.get_pos()
                     if (mx - x) ** 2 + (my - y) ** 2 <= 15 ** 2:
                         clicked, rt = True, time.time() - start
                         break
         if record and results is not None:
-            results.append([module["name"], "ATTENTION", "", "", clicked, clicked, rt])
+            results.append([module["name"], "ATTENTION", "", "", clicked, clicked, rt, "", "", ""]
+                           + trial_info)
         return None, None  # <- safe tuple return
 
     # ---------------- SELECT TARGET AND CONDITION ----------------
-    all_targets = module["left_group"] + module["right_group"]
-    target = random.choice(all_targets)
-    group_index = 0 if target in module["left_group"] else 1
-    condition = forced_condition if forced_condition else random.choice(["congruent", "incongruent", "neutral"])
-
-    if condition == "congruent":
-        flanker = random.choice(module["left_group"] if group_index == 0 else module["right_group"])
-    elif condition == "incongruent":
-        flanker = random.choice(module["right_group"] if group_index == 0 else module["left_group"])
-    else:
-        flanker = random.choice(module["neutral"])
+    target = random.choice(module["targets"])
+    group_index = module["side"][target]
+    condition = forced_condition if forced_condition else random.choice(CONDITIONS)
+    flanker = random.choice(module["flankers"][group_index, condition])
 
     # ---------------- DISPLAY STIMULI ----------------
     screen.fill(BG_COLOR)
-    if module["type"] == "text":
-        display = f"{flanker}   {target}   {flanker}"
-        draw_text_center(display, SCREEN_H // 2)
-    elif module["type"] == "image":
-        spacing = 200
-        y = SCREEN_H // 2
-        x_center = SCREEN_W // 2
-        for i, img_key in enumerate([flanker, target, flanker]):
-            img = module["img_dict"][img_key]
-            rect = img.get_rect(center=(x_center + (i - 1) * spacing, y))
-            screen.blit(img, rect)
-    elif module["type"] == "mixed":
-        flank_letter = random.choice(module["letters"])
-        draw_mixed_triplet(target, flank_letter, module["img_dict"])
-    pygame.display.flip()
+    if module["type"] == "mixed":
+        draw_array(module, target, random.choice(module["letters"]))
+    else:
+        draw_array(module, target, flanker)
+    onset = next_frame()
 
     # ---------------- RESPONSE COLLECTION ----------------
-    start = time.time()
+    # the array stays up for STIM_FRAMES refreshes, then the mask replaces it;
+    # responses are accepted throughout
+    frames, offset = 1, None
     while True:
-        for e in pygame.event.get():
+        for e in poll_events():
             if e.type == pygame.KEYDOWN and e.key in (pygame.K_LEFT, pygame.K_RIGHT):
                 response = key_map[e.key]
-                rt = time.time() - start
+                rt = time.perf_counter() - session_start - onset
                 correct = (response == group_index)
                 if record and results is not None:
                     results.append([module["name"], target, condition, flanker,
-                                    ("LEFT" if response == 0 else "RIGHT"), correct, rt])
+                                    ("LEFT" if response == 0 else "RIGHT"), correct, rt,
+                                    onset, "" if offset is None else offset,
+                                    "" if STIM_FRAMES is None else frames] + trial_info)
                 return correct, rt
+
+        if STIM_FRAMES is not None and offset is None:
+            if frames < STIM_FRAMES:
+                next_frame()
+                frames += 1
+            else:
+                draw_mask(module)
+                offset = next_frame()
+# -------------------- PRACTICE --------------------
+def practice_retry_screen(acc):
+    screen.fill(BG_COLOR)
+    draw_text_center(f"Practice Accuracy: {acc:.1f}%", SCREEN_H // 2 - 40)
+    draw_text_center("Let's practice a little more.", SCREEN_H // 2 + 20)
+    pygame.display.flip()
+    pygame.time.delay(2000)
+
+def run_practice(module, practice_writer=None):
+    # rolling accuracy over the last PRACTICE_WINDOW answered trials,
+    # updated incrementally as trials come in
+    window = deque(maxlen=PRACTICE_WINDOW)
+    hits = 0
+    rts = []
+    acc = 0
+    for block in range(1, PRACTICE_MAX_BLOCKS + 1):
+        rows = []
+        answered = 0
+        while answered < PRACTICE_TRIALS:
+            c, rt = run_trial(module, record=practice_writer is not None, results=rows)
+            if c is None:
+                continue    # attention checks don't use up the block's trials
+            answered += 1
+            if len(window) == window.maxlen:
+                hits -= window[0]
+            window.append(c)
+            hits += c
+            rts.append(rt)
+
+        if practice_writer is not None:
+            for row in rows:
+                rt = "" if row[6] is None else round(row[6] * 1000)
+                practice_writer.writerow([row[0], block, row[1], row[2], int(row[5]), rt])
+
+        acc = (hits / len(window) * 100) if window else 0
+        if len(window) == window.maxlen and acc >= PRACTICE_CRITERION * 100:
+            break
+        if block < PRACTICE_MAX_BLOCKS:
+            practice_retry_screen(acc)
+            module_instructions(module)
+
+    mean_rt = (sum(rts) / len(rts)) if rts else 0
+    return acc, mean_rt
+
 # -------------------- MAIN --------------------
+def ask_resume(state):
+    done = state["module"] * TRIALS + state["trial"]
+    answer = input(f"Session for {state['participant']} stopped after {done} of "
+                   f"{len(state['module_order']) * TRIALS} trials. Resume? [y/n]: ")
+    return answer.strip().lower().startswith("y")
+
 participant = input("Enter Participant ID: ")
-all_results = []
-random.shuffle(modules)
+session_start = time.perf_counter()
+
+state = load_journal(participant)
+resuming = False
+if state is not None and not state["complete"]:
+    state = resume_point(state, count_rows(f"{participant}.csv.part"), TRIALS)
+    resuming = ask_resume(state)
+if resuming:
+    by_name = {m["name"]: m for m in modules}
+    modules = [by_name[name] for name in state["module_order"]]
+    # session times carry on from the last checkpoint instead of restarting at 0
+    session_start = time.perf_counter() - state.get("elapsed", 0.0)
+else:
+    seed = random.randrange(2 ** 32)
+    random.Random(seed).shuffle(modules)
+    state = new_journal(participant, seed, [m["name"] for m in modules])
+    save_journal(state)
+
+all_results = ResultsWriter(f"{participant}.csv", HEADER,
+                            keep_rows=state["rows"] if resuming else None)
+
+practice_file, practice_writer = None, None
+if LOG_PRACTICE:
+    practice_exists = resuming and os.path.exists(f"{participant}_practice.csv")
+    practice_file = open(f"{participant}_practice.csv", "a" if practice_exists else "w", newline="")
+    practice_writer = csv.writer(practice_file)
+    if not practice_exists:
+        practice_writer.writerow(["Module", "Block", "Target/Check", "Condition", "Correct", "RT_ms"])
+
+results_db = open_db(RESULTS_DB, HEADER) if RESULTS_DB else None
+
+event_log = EventLog(f"{participant}_events.bin", append=resuming)
+
+# ---- SESSION METADATA ----
+session_config = {name: globals()[name] for name in (
+    "TRIALS", "PRACTICE_TRIALS", "PRACTICE_CRITERION", "PRACTICE_WINDOW", "PRACTICE_MAX_BLOCKS",
+    "FIX_MS", "STIM_MS", "ITI_MS", "STIM_SIZE", "FPS", "FONT_SIZE",
+    "SCREEN_W", "SCREEN_H", "FLANKERS_PER_SIDE", "LAYOUT", "SPACING_PX", "SPACING_DEG",
+    "VIEWING_DISTANCE_CM", "SCREEN_WIDTH_CM", "STIM_FRAMES", "MASK_CELL", "VSYNC",
+    "SCHEMA_VERSION",
+)}
+display_info = {
+    # without vsync flips are only paced by the FPS cap, which says nothing about the display
+    "refresh_hz": measure_refresh(next_frame) if vsync_active else None,
+    "vsync": vsync_active,
+    "window": list(pygame.display.get_window_size()),
+    "desktop": [list(size) for size in pygame.display.get_desktop_sizes()],
+    "driver": pygame.display.get_driver(),
+}
+meta_path = f"{participant}_meta.json"
+meta = load_meta(meta_path) if resuming else None
+if meta is None:
+    meta = build_meta(participant, state["seed"], state["module_order"], session_config,
+                      asset_hashes, display_info, {
+                          "pygame": pygame.version.ver,
+                          "sdl": ".".join(map(str, pygame.get_sdl_version())),
+                      })
+else:
+    resumed_hash = config_hash(session_config, asset_hashes)
+    if resumed_hash != meta["config_hash"]:
+        print(f"⚠️ Configuration changed since this session started ({meta['config_hash']} -> {resumed_hash})")
+    meta["resumed"].append({"started": datetime.now().isoformat(timespec="seconds"),
+                            "config_hash": resumed_hash, "display": display_info})
+write_meta(meta_path, meta)
+
+def store_block(module):
+    if results_db is not None:
+        rows = [r for r in all_results.rows if r[0] == module["name"]]
+        write_block(results_db, participant, module["name"], HEADER, rows)
+
+def previous_trial(module):
+    # condition and correctness of the last non-attention trial of this module
+    for row in reversed(all_results.rows):
+        if row[0] != module["name"]:
+            break
+        if row[1] != "ATTENTION":
+            return [row[2], row[5]]
+    return ["", ""]
+
+def checkpoint():
+    state["rows"] = len(all_results.rows)
+    state["elapsed"] = time.perf_counter() - session_start
+    all_results.call(save_journal, dict(state))
 
 instruction_screen()
 
-for module in modules:
+for module_index, module in enumerate(modules):
+    if module_index < state["module"]:
+        store_block(module)     # finished before the crash
+        continue
     module_instructions(module)
+    prepare_arrays(module)
 
-    # ---- PRACTICE ----
-    practice_correct, practice_rts = [], []
-    for _ in range(PRACTICE_TRIALS):
-        c, rt = run_trial(module, record=False)
-        if c is not None:
-            practice_correct.append(c)
-            practice_rts.append(rt)
-
-    acc = (sum(practice_correct) / len(practice_correct) * 100) if practice_correct else 0
-    mean_rt = (sum(practice_rts) / len(practice_rts)) if practice_rts else 0
-
-    screen.fill(BG_COLOR)
-    draw_text_center("Practice Complete", SCREEN_H // 2 - 40)
-    draw_text_center(f"Accuracy: {acc:.1f}%", SCREEN_H // 2)
-    draw_text_center("Experiment Begins", SCREEN_H // 2 + 80)
-    pygame.display.flip()
-    pygame.time.delay(2000)
-
-    # ---- MAIN TRIALS ----
-    conditions = ["congruent", "incongruent", "neutral"]
+    # every module draws from its own seeded stream, so a resumed session
+    # sees the same condition order as the original one
+    random.seed(f"{state['seed']}:{module['name']}")
+    conditions = list(CONDITIONS)
     per_condition = TRIALS // len(conditions)
     condition_list = conditions * per_condition
     while len(condition_list) < TRIALS:
         condition_list.append(random.choice(conditions))
     random.shuffle(condition_list)
 
-    for cond in condition_list:
-        run_trial(module, record=True, results=all_results, forced_condition=cond)
+    # ---- PRACTICE ----
+    if not state["practice_done"]:
+        acc, mean_rt = run_practice(module, practice_writer)
+        if practice_file is not None:
+            practice_file.flush()
+        event_log.flush()
+        state["practice_done"] = True
+        checkpoint()
+
+        screen.fill(BG_COLOR)
+        draw_text_center("Practice Complete", SCREEN_H // 2 - 40)
+        draw_text_center(f"Accuracy: {acc:.1f}%", SCREEN_H // 2)
+        draw_text_center("Experiment Begins", SCREEN_H // 2 + 80)
+        pygame.display.flip()
+        pygame.time.delay(2000)
+
+    # ---- MAIN TRIALS ----
+    for trial_index in range(state["trial"], TRIALS):
+        random.seed(f"{state['seed']}:{module['name']}:{trial_index}")
+        event_log.trial = len(all_results.rows)
+        run_trial(module, record=True, results=all_results, forced_condition=condition_list[trial_index],
+                  trial_info=[module_index, trial_index, len(all_results.rows)] + previous_trial(module))
+        state["trial"] = trial_index + 1
+        checkpoint()
+
+    event_log.trial = -1
+    event_log.flush()
+    release_arrays(module)
+    store_block(module)
+    state.update(module=module_index + 1, trial=0, practice_done=False)
+    checkpoint()
 
 # -------------------- SAVE RESULTS --------------------
-filename = f"{participant}.csv"
-with open(filename, "w", newline="") as f:
-    writer = csv.writer(f)
-    writer.writerow(["Module", "Target/Check", "Condition", "Flanker", "Response", "Correct", "RT"])
-    writer.writerows(all_results)
+if practice_file is not None:
+    practice_file.close()
+
+event_log.flush()
+filename = all_results.path if all_results.close() else all_results.part_path
+state["complete"] = True
+save_journal(state)
+if results_db is not None:
+    results_db.close()
+if EXPORT_NPZ:
+    stimuli = sorted({s for m in modules for s in m["targets"] + m["flankers"][0, "neutral"]})
+    export_npz(f"{participant}.npz", HEADER, all_results.rows, {
+        "Module": sorted(m["name"] for m in modules),
+        "Target/Check": stimuli,
+        "Condition": list(CONDITIONS),
+        "Prev_Condition": list(CONDITIONS),
+        "Flanker": stimuli,
+        "Response": ["LEFT", "RIGHT"],
+    })
 
 # -------------------- END --------------------
 screen.fill(BG_COLOR)
@@ -0,0 +1,59 @@
+''' Raw input / window event log kept in a preallocated buffer.
+
+Every event is packed into a fixed-size binary record inside one bytearray,
+so logging allocates nothing per event. flush() appends the buffered
+records to the log file (once per block); if the buffer fills up before
+that, it is flushed early, so no event is ever dropped.
+
+Each record is RECORD = "<diIIii" (28 bytes):
+    time    float64  seconds since session start (perf_counter) of the
+                     event poll that returned the event
+    trial   int32    sequence number of the recorded trial, -1 outside main trials
+    type    uint32   pygame event type
+    code    uint32   key or mouse button (0 if none)
+    x, y    int32    mouse position (0 if none)
+
+Read it back with read_events(), or with numpy.fromfile(path, dtype=EVENT_DTYPE).
+'''
+
+import atexit
+import struct
+
+RECORD = struct.Struct("<diIIii")
+EVENT_DTYPE = [("time", "<f8"), ("trial", "<i4"), ("type", "<u4"),
+               ("code", "<u4"), ("x", "<i4"), ("y", "<i4")]
+CAPACITY = 8192
+
+
+class EventLog:
+    def __init__(self, path, capacity=CAPACITY, append=False):
+        self.path = path
+        self.capacity = capacity
+        self.trial = -1
+        self._buf = bytearray(capacity * RECORD.size)
+        self._count = 0
+        if not append:
+            open(path, "wb").close()
+        atexit.register(self.flush)     # keep the events of a crashed block
+
+    def log(self, e, t):
+        if self._count == self.capacity:
+            self.flush()
+        x, y = getattr(e, "pos", (0, 0))
+        code = getattr(e, "key", None) or getattr(e, "button", 0)
+        RECORD.pack_into(self._buf, self._count * RECORD.size, t, self.trial, e.type, code, x, y)
+        self._count += 1
+
+    def flush(self):
+        if not self._count:
+            return
+        with open(self.path, "ab") as f:
+            f.write(memoryview(self._buf)[:self._count * RECORD.size])
+        self._count = 0
+
+
+def read_events(path):
+    '''All records of an event log as a list of tuples.'''
+    with open(path, "rb") as f:
+        data = f.read()
+    return list(RECORD.iter_unpack(data[:len(data) - len(data) % RECORD.size]))
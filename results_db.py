@@ -0,0 +1,67 @@
+''' Optional SQLite backend collecting the trials of every participant.
+
+All stations can write into one database file: it runs in WAL mode and every
+block (module) goes in as one short transaction, so concurrent writers only
+wait on each other briefly. Query slices directly, e.g.
+
+    SELECT * FROM trials WHERE module = 'Emoji Module' AND condition = 'incongruent'
+'''
+
+import re
+import sqlite3
+
+# SQLite column affinities; anything not listed is stored as TEXT
+COLUMN_TYPES = {
+    "Correct": "INTEGER",
+    "RT": "REAL",
+    "Onset": "REAL",
+    "Offset": "REAL",
+    "Frames": "INTEGER",
+    "Block": "INTEGER",
+    "Trial": "INTEGER",
+    "Sequence": "INTEGER",
+    "Prev_Correct": "INTEGER",
+}
+INDEXED = ("participant", "module", "condition", "prev_condition")
+
+
+def column_name(header_name):
+    return re.sub(r"\W+", "_", header_name).strip("_").lower()
+
+
+def open_db(path, header):
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+
+    columns = [f"{column_name(h)} {COLUMN_TYPES.get(h, 'TEXT')}" for h in header]
+    with conn:
+        conn.execute(f"CREATE TABLE IF NOT EXISTS trials (participant TEXT NOT NULL, {', '.join(columns)})")
+        # databases created by an older header gain the new columns
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(trials)")}
+        for h, col in zip(header, columns):
+            if column_name(h) not in existing:
+                conn.execute(f"ALTER TABLE trials ADD COLUMN {col}")
+        for col in INDEXED:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_trials_{col} ON trials ({col})")
+    return conn
+
+
+def _value(v):
+    if v is None or v == "":
+        return None
+    if v is True or v == "True":
+        return 1
+    if v is False or v == "False":
+        return 0
+    return v
+
+
+def write_block(conn, participant, module_name, header, rows):
+    '''Replace one participant's rows for a module in a single transaction.'''
+    names = ["participant"] + [column_name(h) for h in header]
+    sql = f"INSERT INTO trials ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})"
+    with conn:
+        # idempotent, so a resumed session can safely write a block again
+        conn.execute("DELETE FROM trials WHERE participant = ? AND module = ?", (participant, module_name))
+        conn.executemany(sql, ([participant] + [_value(v) for v in row] for row in rows))
@@ -0,0 +1,117 @@
+''' Typed, columnar export of a session's trials as a NumPy .npz file.
+
+The file holds one structured array, "trials", with float64 times, a bool
+"correct" column and int16 category codes for the text columns, plus a
+"labels_<field>" array per categorical field giving the label of each code
+(-1 = empty / not applicable). When the games pass the same vocabularies to
+every session, codes mean the same thing in every file, so sessions can be
+concatenated directly.
+
+The archive is stored uncompressed, so load_npz can memory-map the trials
+array instead of reading it.
+'''
+
+import math
+import zipfile
+
+try:
+    import numpy as np
+except ImportError:     # numpy is optional for running the experiment
+    np = None
+
+from results_db import column_name
+
+# how each results column is stored; unlisted columns are categorical
+FIELD_TYPES = {
+    "Correct": "?",
+    "RT": "f8",
+    "Onset": "f8",
+    "Offset": "f8",
+    "Frames": "i2",
+    "Block": "i2",
+    "Trial": "i2",
+    "Sequence": "i4",
+    "Prev_Correct": "i1",      # -1 = no previous trial
+}
+CODE_TYPE = "i2"
+
+
+def _float(v):
+    return math.nan if v is None or v == "" else float(v)
+
+
+def _int(v):
+    return -1 if v is None or v == "" else int(v)
+
+
+def _bool(v):
+    return v is True or v == "True" or v == 1
+
+
+def _tristate(v):
+    return -1 if v is None or v == "" else int(_bool(v))
+
+
+def export_npz(path, header, rows, categories):
+    '''Write rows as a structured array; categories maps column -> list of labels.'''
+    if np is None:
+        print(f"⚠️ numpy is not installed, skipping {path}")
+        return False
+
+    fields = [(column_name(h), FIELD_TYPES.get(h, CODE_TYPE)) for h in header]
+    fields.append(("attention", "?"))
+    trials = np.zeros(len(rows), dtype=fields)
+
+    labels = {}
+    for i, h in enumerate(header):
+        name, kind = fields[i]
+        values = [row[i] for row in rows]
+        if h not in FIELD_TYPES:
+            if h in categories:
+                vocab = list(categories[h])
+            else:
+                vocab = sorted({str(v) for v in values if v != ""})
+            codes = {label: code for code, label in enumerate(vocab)}
+            trials[name] = [codes.get(str(v), -1) for v in values]
+            labels[f"labels_{name}"] = np.array(vocab, dtype=str)
+        elif kind == "f8":
+            trials[name] = [_float(v) for v in values]
+        elif kind == "i1":
+            trials[name] = [_tristate(v) for v in values]
+        elif kind in ("i2", "i4"):
+            trials[name] = [_int(v) for v in values]
+        else:
+            trials[name] = [_bool(v) for v in values]
+    trials["attention"] = [row[1] == "ATTENTION" for row in rows]
+
+    np.savez(path, trials=trials, **labels)
+    return True
+
+
+def load_npz(path, mmap_mode="r"):
+    '''Load a session export, memory-mapping the trials array.
+
+    Returns (trials, labels) where labels maps field name -> label array.
+    '''
+    with np.load(path) as data:
+        labels = {k[len("labels_"):]: data[k] for k in data.files if k.startswith("labels_")}
+        if mmap_mode is None:
+            return data["trials"], labels
+
+    # np.savez stores members uncompressed, so the .npy data sits at a fixed
+    # offset inside the zip and can be mapped in place
+    with zipfile.ZipFile(path) as zf:
+        info = zf.getinfo("trials.npy")
+    with open(path, "rb") as f:
+        f.seek(info.header_offset + 26)
+        name_len = int.from_bytes(f.read(2), "little")
+        extra_len = int.from_bytes(f.read(2), "little")
+        f.seek(info.header_offset + 30 + name_len + extra_len)
+        if np.lib.format.read_magic(f) == (1, 0):
+            shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+    trials = np.memmap(path, dtype=dtype, mode=mmap_mode, offset=offset, shape=shape,
+                       order="F" if fortran else "C")
+    return trials, labels
@@ -0,0 +1,138 @@
+''' Versioned schema of the per-participant results files.
+
+Every results file starts with a marker line, "# flanker-results schema=N",
+followed by the CSV header. Files written before the marker existed are
+recognised by their header. Old files are upgraded by a column mapping that
+is worked out once per source header and then applied to all rows with a
+single itemgetter call per row:
+
+    python results_schema.py migrate RESULTS_DIR      # upgrade in place
+    python results_schema.py check RESULTS_DIR        # report versions
+'''
+
+import argparse
+import csv
+import os
+from functools import lru_cache
+from operator import itemgetter
+
+MARKER = "# flanker-results schema="
+
+SCHEMAS = {
+    1: ["Module", "Target/Check", "Condition", "Flanker", "Response", "Correct", "RT"],
+}
+SCHEMAS[2] = SCHEMAS[1] + ["Onset", "Offset", "Frames"]
+SCHEMAS[3] = SCHEMAS[2] + ["Block", "Trial", "Sequence", "Prev_Condition", "Prev_Correct"]
+
+SCHEMA_VERSION = 3
+HEADER = SCHEMAS[SCHEMA_VERSION]
+
+# columns renamed between versions (old name -> current name)
+RENAMES = {}
+
+
+def write_header(f, header=HEADER, version=SCHEMA_VERSION):
+    f.write(f"{MARKER}{version}\r\n")
+    csv.writer(f).writerow(header)
+
+
+def read_header(f):
+    '''Read the marker and header lines; returns (version, columns).
+
+    version is None for a file that matches no known schema.
+    '''
+    line = f.readline()
+    if line.startswith(MARKER):
+        version = int(line[len(MARKER):])
+        line = f.readline()
+    else:
+        version = None
+    columns = next(csv.reader([line]), [])
+    if version is None:
+        version = next((v for v, cols in SCHEMAS.items() if cols == columns), None)
+    return version, columns
+
+
+def header_lines(path):
+    '''Number of lines before the first data row (marker and header).'''
+    with open(path, newline="") as f:
+        return 2 if f.readline().startswith(MARKER) else 1
+
+
+def is_results_file(path):
+    with open(path, newline="") as f:
+        return read_header(f)[0] is not None
+
+
+@lru_cache(maxsize=None)
+def _getter(columns, target):
+    # index of every target column in a source row padded with one ""
+    source = {RENAMES.get(c, c): i for i, c in enumerate(columns)}
+    fill = len(columns)
+    return itemgetter(*[source.get(c, fill) for c in target])
+
+
+def upgrade(columns, rows, target=HEADER):
+    '''Rows laid out as `columns`, re-laid out as `target`; missing columns are "".'''
+    columns, target = tuple(columns), tuple(target)
+    if columns == target:
+        return rows
+    getter = _getter(columns, target)
+    if len(target) == 1:
+        return [[getter(row + [""])] for row in rows]
+    return [list(getter(row + [""])) for row in rows]
+
+
+def read_results(path, target=HEADER):
+    '''All rows of a results file, upgraded to the target columns.'''
+    with open(path, newline="") as f:
+        version, columns = read_header(f)
+        rows = list(csv.reader(f))
+    return version, upgrade(columns, rows, target)
+
+
+def write_results(path, rows, header=HEADER):
+    tmp = path + ".tmp"
+    with open(tmp, "w", newline="") as f:
+        write_header(f, header)
+        csv.writer(f).writerows(rows)
+    os.replace(tmp, path)
+
+
+def results_files(results_dir):
+    for name in sorted(os.listdir(results_dir)):
+        path = os.path.join(results_dir, name)
+        if name.endswith(".csv") and is_results_file(path):
+            yield path
+
+
+def migrate(results_dir):
+    '''Upgrade every older results file in results_dir in place.'''
+    migrated = 0
+    for path in results_files(results_dir):
+        with open(path, newline="") as f:
+            marked = f.readline().startswith(MARKER)
+        version, rows = read_results(path)
+        if version == SCHEMA_VERSION and marked:
+            continue
+        write_results(path, rows)
+        migrated += 1
+    return migrated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("command", choices=["migrate", "check"])
+    parser.add_argument("results_dir")
+    args = parser.parse_args()
+    if args.command == "migrate":
+        count = migrate(args.results_dir)
+        print(f"Upgraded {count} file(s) to schema {SCHEMA_VERSION}")
+    else:
+        for path in results_files(args.results_dir):
+            with open(path, newline="") as f:
+                print(f"{os.path.basename(path)}\tschema {read_header(f)[0]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+''' Streams trial results to disk from a background thread.
+
+Rows are handed over through a queue, so the trial loop never waits on the
+disk. The session is written to "<file>.part", flushed after every row and
+fsynced periodically, and renamed into place only when the session ends.
+'''
+
+import atexit
+import csv
+import os
+import queue
+import threading
+import time
+
+from results_schema import write_header, header_lines
+
+FSYNC_EVERY = 1.0   # seconds between fsyncs while rows are coming in
+
+_STOP = object()
+
+
+class ResultsWriter:
+    def __init__(self, path, header, fsync_every=FSYNC_EVERY, keep_rows=None):
+        self.path = path
+        self.part_path = path + ".part"
+        self.fsync_every = fsync_every
+        self.rows = []          # in-memory copy for end-of-session exports
+        self.error = None
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+
+        if keep_rows is not None and os.path.exists(self.part_path):
+            # resuming: keep the first keep_rows rows of the interrupted session
+            self.rows = self._restore(keep_rows)
+            self._file = open(self.part_path, "a", newline="")
+            self._writer = csv.writer(self._file)
+        else:
+            self._file = open(self.part_path, "w", newline="")
+            self._writer = csv.writer(self._file)
+            write_header(self._file, header)
+
+        self._thread = threading.Thread(target=self._run, name="results-writer", daemon=True)
+        self._thread.start()
+        # on a crash, still write out whatever was queued (the .part file is kept)
+        atexit.register(self._stop)
+
+    def _restore(self, keep_rows):
+        skip = header_lines(self.part_path)
+        with open(self.part_path, newline="") as f:
+            lines = f.readlines()[:keep_rows + skip]
+        tmp = self.part_path + ".tmp"
+        with open(tmp, "w", newline="") as f:
+            f.writelines(lines)
+        os.replace(tmp, self.part_path)
+        return list(csv.reader(lines[skip:]))
+
+    def append(self, row):
+        self.rows.append(row)
+        self._queue.put(row)
+
+    def call(self, fn, *args):
+        '''Run fn(*args) on the writer thread once the rows queued so far are written.'''
+        self._queue.put(lambda: fn(*args))
+
+    def _run(self):
+        last_sync = time.monotonic()
+        pending = False
+        try:
+            while True:
+                try:
+                    row = self._queue.get(timeout=self.fsync_every)
+                except queue.Empty:
+                    row = None
+                if row is _STOP:
+                    break
+                if callable(row):
+                    row()
+                elif row is not None:
+                    self._writer.writerow(row)
+                    self._file.flush()
+                    pending = True
+                if pending and time.monotonic() - last_sync >= self.fsync_every:
+                    os.fsync(self._file.fileno())
+                    last_sync = time.monotonic()
+                    pending = False
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except Exception as e:     # a failed row or call(): keep the .part file as it is
+            self.error = e
+            print(f"⚠️ Could not write results to {self.part_path}: {e}")
+        finally:
+            self._file.close()
+
+    def _stop(self):
+        if not self._closed:
+            self._closed = True
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def close(self):
+        '''Write out the remaining rows and move the finished file into place.'''
+        self._stop()
+        if self.error is None:
+            os.replace(self.part_path, self.path)
+        return self.error is None
@@ -0,0 +1,68 @@
+''' Compact journal of session state, used to resume a session after a crash.
+
+The journal is a small JSON file next to the results. It is rewritten
+atomically after every trial from the results writer thread, so it never
+claims more trials than the results file holds.
+'''
+
+import json
+import os
+
+from results_schema import header_lines
+
+
+def journal_path(participant):
+    return f"{participant}_journal.json"
+
+
+def new_journal(participant, seed, module_order):
+    return {
+        "participant": participant,
+        "seed": seed,
+        "module_order": module_order,
+        "module": 0,            # index into module_order
+        "trial": 0,             # next main trial of that module
+        "practice_done": False,
+        "rows": 0,              # result rows written so far
+        "elapsed": 0.0,         # session seconds at the last checkpoint
+        "complete": False,
+    }
+
+
+def load_journal(participant):
+    path = journal_path(participant)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Ignoring unreadable journal {path}: {e}")
+        return None
+
+
+def save_journal(state):
+    path = journal_path(state["participant"])
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, separators=(",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def count_rows(part_path):
+    '''Number of data rows in a results .part file (0 if it is missing).'''
+    if not os.path.exists(part_path):
+        return 0
+    skip = header_lines(part_path)
+    with open(part_path, newline="") as f:
+        return max(sum(1 for _ in f) - skip, 0)
+
+
+def resume_point(state, rows_on_disk, trials_per_module):
+    '''Reconcile the journal with the rows that actually reached the disk.'''
+    rows = min(state["rows"], rows_on_disk)
+    module, trial = divmod(rows, trials_per_module)
+    practice_done = state["practice_done"] if module == state["module"] else trial > 0
+    return dict(state, module=module, trial=trial, rows=rows, practice_done=practice_done)
@@ -0,0 +1,68 @@
+''' Metadata sidecar written next to every session's results.
+
+Holds everything needed to tell whether two sessions were run under the
+same conditions: configuration constants, display measurements, library
+versions and content hashes of every stimulus asset. config_hash condenses
+the configuration and assets into one key for caches and batch filters.
+'''
+
+import hashlib
+import json
+import os
+import platform
+import time
+from datetime import datetime
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def config_hash(config, assets):
+    blob = json.dumps({"config": config, "assets": assets}, sort_keys=True)
+    return hashlib.sha256(blob.encode()).hexdigest()[:16]
+
+
+def measure_refresh(flip, frames=60):
+    '''Median interval between `frames` calls of flip(), as a rate in Hz.'''
+    flip()
+    stamps = []
+    for _ in range(frames + 1):
+        flip()
+        stamps.append(time.perf_counter())
+    gaps = sorted(b - a for a, b in zip(stamps, stamps[1:]))
+    median = gaps[len(gaps) // 2]
+    return round(1 / median, 2) if median > 0 else None
+
+
+def build_meta(participant, seed, module_order, config, assets, display, versions):
+    return {
+        "participant": participant,
+        "started": datetime.now().isoformat(timespec="seconds"),
+        "seed": seed,
+        "module_order": module_order,
+        "config": config,
+        "config_hash": config_hash(config, assets),
+        "display": display,
+        "versions": dict(versions, python=platform.python_version(), platform=platform.platform()),
+        "assets": assets,
+        "resumed": [],
+    }
+
+
+def write_meta(path, meta):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(meta, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def load_meta(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)